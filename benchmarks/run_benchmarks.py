@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""Benchmarks for the EasyEDA to KiCad conversion pipeline.
+
+Runs fully offline: the stub easyeda2kicad in benchmarks/stub (module and executable) stands
+in for the real converter and simulates the EasyEDA/LCSC API latency. Everything is written
+below a temporary OUTPUT_BASE, and the results are saved as JSON so runs of different
+versions can be compared:
+
+    python3 benchmarks/run_benchmarks.py --output bench-before.json
+    python3 benchmarks/run_benchmarks.py --output bench-after.json --only throughput,listing
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+STUB_DIR = os.path.join(BENCH_DIR, "stub")
+APP_DIR = os.path.join(REPO_DIR, "easyeda-to-kicad")
+BENCHMARKS = ("throughput", "organize", "listing", "lookup", "search", "sse")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="comma-separated subset of " + ", ".join(BENCHMARKS))
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per simulated API call")
+    parser.add_argument("--parts", type=int, default=40, help="parts per throughput batch")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="parallel conversion levels to measure")
+    parser.add_argument("--organize-parts", type=int, default=200, help="staged parts committed by organize_files")
+    parser.add_argument("--listing-files", type=int, default=10000, help="files in the listed directory")
+    parser.add_argument("--catalog-ids", type=int, default=50000, help="parts in the catalog for ID lookups")
+    parser.add_argument("--search-parts", type=int, default=20000, help="indexed parts for /search queries")
+    parser.add_argument("--sse-clients", type=int, default=50, help="concurrent /logs subscribers")
+    parser.add_argument("--sse-lines", type=int, default=500, help="log lines published to the subscribers")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary output directory")
+    return parser.parse_args()
+
+
+def summarize(samples):
+    """Timing summary in milliseconds."""
+    ordered = sorted(samples)
+    return {"count": len(ordered), "mean_ms": round(statistics.mean(ordered) * 1000, 3),
+            "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+            "max_ms": round(ordered[-1] * 1000, 3)}
+
+
+def wait_for_job(app, job_id, timeout=600):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = app.get_job(job_id)
+        if job["status"] not in app.JOB_ACTIVE_STATES:
+            return job
+        time.sleep(0.05)
+    raise TimeoutError(f"Job {job_id} did not finish within {timeout}s")
+
+
+def bench_throughput(app, args):
+    """Batch conversion through the job scheduler, worker pool and library commit."""
+    from concurrent.futures import ThreadPoolExecutor
+    results = {}
+    for level, concurrency in enumerate(int(value) for value in args.concurrency.split(",")):
+        app.conversion_executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="worker")
+        app.upstream_rate_limiter = app.TokenBucket(0, concurrency)  # Measure the pipeline, not the limiter
+        library_name = f"{app.LIB_PREFIX}_bench_c{concurrency}"
+        library_dir = os.path.join(app.OUTPUT_BASE, app.LIBRARY_ROOT_NAME, library_name)
+        # Distinct IDs per level, so the component cache never serves a later level
+        lcsc_ids = [f"C{100000 * (level + 1) + i}" for i in range(args.parts)]
+        started = time.perf_counter()
+        job = app.create_job(library_name, library_dir, lcsc_ids)
+        app.close_job_input(job)
+        job = wait_for_job(app, job["id"])
+        elapsed = time.perf_counter() - started
+        app.conversion_executor.shutdown()
+        results[str(concurrency)] = {"parts": args.parts, "seconds": round(elapsed, 3),
+                                     "parts_per_second": round(args.parts / elapsed, 3),
+                                     "processed": len(job["results"]["processed"]),
+                                     "failed": len(job["results"]["failed"])}
+        print(f"  concurrency {concurrency}: {args.parts / elapsed:.2f} parts/s")
+    return {"latency_s": args.latency, "levels": results}
+
+
+def bench_organize(app, args):
+    """organize_files cost per part, with the stub's output staged in advance."""
+    from easyeda2kicad.__main__ import main as stub_main
+    from easyeda2kicad.easyeda import easyeda_api
+    easyeda_api.LATENCY = 0
+    library_dir = os.path.join(app.OUTPUT_BASE, app.LIBRARY_ROOT_NAME, f"{app.LIB_PREFIX}_bench_organize")
+    staging_dir = os.path.join(app.OUTPUT_BASE, "temp", "bench_organize")
+    os.makedirs(staging_dir, exist_ok=True)
+    prefixes = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(args.organize_parts):
+            prefix = os.path.join(staging_dir, f"temp_C{900000 + i}")
+            stub_main(["--lcsc_id", f"C{900000 + i}", "--full", "--output", prefix])
+            prefixes.append(prefix)
+    samples = []
+    failures = 0
+    for prefix in prefixes:
+        started = time.perf_counter()
+        ok = app.organize_files(prefix, library_dir, [])
+        samples.append(time.perf_counter() - started)
+        failures += not ok
+    print(f"  organize_files: {statistics.mean(samples) * 1000:.2f} ms/part")
+    return {"per_part": summarize(samples), "failed": failures, "dedupe": app.blob_store.get_stats()}
+
+
+def bench_listing(app, args):
+    """render_directory_listing on a large directory, on a cold and on a warm listing cache."""
+    library_dir = os.path.join(app.OUTPUT_BASE, app.LIBRARY_ROOT_NAME, f"{app.LIB_PREFIX}_bench_listing")
+    directory = os.path.join(library_dir, "footprints")
+    os.makedirs(directory, exist_ok=True)
+    for i in range(args.listing_files):
+        with open(os.path.join(directory, f"FP_{i:05d}.kicad_mod"), "w") as f:
+            f.write("(module x)\n")
+    results = {"files": args.listing_files}
+    last_page = -(-args.listing_files // app.PAGE_SIZE)
+    for sort in ("name", "date"):
+        app.listing_cache.clear()
+        started = time.perf_counter()
+        app.render_directory_listing(directory, library_dir, page=1, sort=sort)
+        cold = time.perf_counter() - started
+        warm = []
+        for page in range(1, 51):
+            started = time.perf_counter()
+            app.render_directory_listing(directory, library_dir, page=page * last_page // 50 or 1, sort=sort)
+            warm.append(time.perf_counter() - started)
+        results[sort] = {"cold_ms": round(cold * 1000, 3), "warm": summarize(warm)}
+        print(f"  listing by {sort}: cold {cold * 1000:.1f} ms, warm {statistics.mean(warm) * 1000:.2f} ms")
+    return results
+
+
+def bench_lookup(app, args):
+    """Processed-ID checks against a library catalog."""
+    library_dir = os.path.join(app.OUTPUT_BASE, app.LIBRARY_ROOT_NAME, f"{app.LIB_PREFIX}_bench_lookup")
+    catalog = app.get_catalog(library_dir)
+    now = time.time()
+    with catalog.db:
+        catalog.db.executemany("INSERT OR IGNORE INTO parts (lcsc_id, converted_at, last_access) VALUES (?, ?, ?)",
+                               [(f"C{i}", now, now) for i in range(args.catalog_ids)])
+    started = time.perf_counter()
+    catalog = app.PartCatalog(library_dir)
+    open_seconds = time.perf_counter() - started
+    probes = [f"C{i * 2}" for i in range(args.catalog_ids)]  # Half hit, half miss
+    started = time.perf_counter()
+    hits = sum(1 for lcsc_id in probes if lcsc_id in catalog)
+    lookup_seconds = time.perf_counter() - started
+    print(f"  {len(probes) / lookup_seconds:,.0f} lookups/s, catalog open {open_seconds * 1000:.1f} ms")
+    return {"catalog_parts": args.catalog_ids, "catalog_open_ms": round(open_seconds * 1000, 3),
+            "lookups": len(probes), "hits": hits, "lookups_per_second": round(len(probes) / lookup_seconds)}
+
+
+def bench_search(app, args):
+    """/search queries against a library with many indexed parts."""
+    library_name = f"{app.LIB_PREFIX}_bench_search"
+    library_dir = os.path.join(app.OUTPUT_BASE, app.LIBRARY_ROOT_NAME, library_name)
+    catalog = app.get_catalog(library_dir)
+    packages = ("R0603", "C0402", "SOT-23", "SOIC-8", "LQFP-48")
+    started = time.perf_counter()
+    for i in range(args.search_parts):
+        package = packages[i % len(packages)]
+        artifacts = [{"kind": "symbol", "name": f"{package}_C{i}", "path": os.path.join(library_dir, "symbols", "x"),
+                      "size": 0, "sha256": None,
+                      "properties": {"Value": f"{i % 1000}k", "MPN": f"MPN{i:06d}", "Footprint": f"lib:{package}"}},
+                     {"kind": "footprint", "name": f"{package}.kicad_mod",
+                      "path": os.path.join(library_dir, "footprints", f"{package}.kicad_mod"), "size": 0, "sha256": None}]
+        catalog.record_part(f"C{i}", artifacts)
+    index_seconds = time.perf_counter() - started
+    app.library_state.refresh_libraries()
+    client = app.app.test_client()
+    results = {"parts": args.search_parts, "index_ms_per_part": round(index_seconds / args.search_parts * 1000, 3)}
+    for mode, queries in (("prefix", ["C1", "C12345", "MPN0042", "SOT", "lqfp"]),
+                          ("substring", ["2345", "0603", "PN00042", "OIC", "99k"])):
+        samples = []
+        for query in queries * 10:
+            started = time.perf_counter()
+            response = client.get(f"/search?q={query}&mode={mode}&library={library_name}")
+            samples.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.status_code
+        results[mode] = summarize(samples)
+        print(f"  {mode} search over {args.search_parts} parts: {statistics.mean(samples) * 1000:.2f} ms")
+    return results
+
+
+def bench_sse(app, args):
+    """Fan-out of log lines to many /logs subscribers through the real SSE endpoint."""
+    channel = "bench-sse"
+    received_at = {}
+    ready = threading.Barrier(args.sse_clients + 1)
+
+    def subscriber(number):
+        client = app.app.test_client()
+        response = client.get(f"/logs?job={channel}", buffered=False)
+        chunks = iter(response.response)
+        ready.wait()
+        count = 0
+        for chunk in chunks:
+            chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+            count += chunk.count("data: ")
+            if count >= args.sse_lines:
+                received_at[number] = time.perf_counter()
+                break
+        response.close()
+
+    threads = [threading.Thread(target=subscriber, args=(i,), daemon=True) for i in range(args.sse_clients)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    while app.log_broker.subscribers < args.sse_clients:
+        time.sleep(0.01)
+    started = time.perf_counter()
+    for i in range(args.sse_lines):
+        app.log_broker.publish(f"benchmark line {i}", channel=channel)
+    publish_seconds = time.perf_counter() - started
+    for thread in threads:
+        thread.join(timeout=60)
+    delivered = len(received_at)
+    elapsed = (max(received_at.values()) - started) if received_at else None
+    if elapsed:
+        print(f"  {args.sse_clients} clients: {delivered * args.sse_lines / elapsed:,.0f} lines/s delivered")
+    return {"clients": args.sse_clients, "lines": args.sse_lines, "clients_completed": delivered,
+            "publish_ms": round(publish_seconds * 1000, 3),
+            "all_delivered_ms": round(elapsed * 1000, 3) if elapsed else None,
+            "lines_per_second": round(delivered * args.sse_lines / elapsed) if elapsed else None}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "-C", REPO_DIR, "describe", "--always", "--dirty"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        sys.exit(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+    output_path = os.path.abspath(args.output)
+
+    # The stub has to be found both in-process and by converter workers started from here
+    OUTPUT_BASE = tempfile.mkdtemp(prefix="easyeda_bench_")
+    os.environ["EASYEDA_OUTPUT_BASE"] = OUTPUT_BASE
+    os.environ["STUB_EASYEDA_LATENCY"] = str(args.latency)
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [STUB_DIR, os.environ.get("PYTHONPATH")]))
+    os.environ["PATH"] = os.pathsep.join([os.path.join(STUB_DIR, "bin"), os.environ.get("PATH", "")])
+    sys.path[:0] = [STUB_DIR, APP_DIR]
+
+    import logging
+    import easyeda_to_kicad as app
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = {"revision": git_revision(), "started_at": datetime.now().isoformat(timespec='seconds'),
+               "python": platform.python_version(), "platform": platform.platform(),
+               "parameters": vars(args), "benchmarks": {}}
+    try:
+        for name in selected:
+            print(f"{name}:")
+            results["benchmarks"][name] = globals()[f"bench_{name}"](app, args)
+    finally:
+        if not args.keep:
+            shutil.rmtree(OUTPUT_BASE, ignore_errors=True)
+    with open(output_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output_path}")
@@ -0,0 +1,6 @@
+"""Offline stand-in for the easyeda2kicad package, used by the benchmark suite.
+
+It mirrors the parts of easyeda2kicad 0.x the add-on relies on: ``main(argv)`` in
+``easyeda2kicad.__main__`` writes ``<output>.kicad_sym``, ``<output>.pretty/`` and
+``<output>.3dshapes/`` for one LCSC ID, and ``EasyedaApi`` serves the component data.
+"""
@@ -0,0 +1,75 @@
+import argparse
+import logging
+import os
+import sys
+
+from easyeda2kicad.easyeda.easyeda_api import EasyedaApi
+
+
+def symbol_text(lcsc_id, name, pins):
+    pin_lines = "".join(
+        f'      (pin passive line (at {-7.62 if i % 2 else 7.62} {i * 2.54:.2f} 0) (length 2.54)\n'
+        f'        (name "P{i + 1}" (effects (font (size 1.27 1.27))))\n'
+        f'        (number "{i + 1}" (effects (font (size 1.27 1.27))))\n      )\n'
+        for i in range(pins))
+    return (f'(kicad_symbol_lib\n  (version 20211014)\n  (generator https://github.com/uPesy/easyeda2kicad.py)\n'
+            f'  (symbol "{name}_{lcsc_id}"\n    (in_bom yes)\n    (on_board yes)\n'
+            f'    (property "Reference" "U" (id 0) (at 0 5.08 0))\n'
+            f'    (property "Value" "{name}_{lcsc_id}" (id 1) (at 0 -5.08 0))\n'
+            f'    (property "Footprint" "easyeda2kicad:{name}" (id 2) (at 0 -7.62 0))\n'
+            f'    (property "LCSC Part" "{lcsc_id}" (id 5) (at 0 -10.16 0))\n'
+            f'    (symbol "{name}_{lcsc_id}_0_1"\n'
+            f'      (rectangle (start -5.08 {pins * 1.27 + 2.54:.2f}) (end 5.08 -2.54))\n'
+            f'{pin_lines}    )\n  )\n)\n')
+
+
+def footprint_text(name, pins, model_path):
+    pads = "".join(f'  (pad {i + 1} smd rect (at {i * 0.5:.2f} 0) (size 0.3 0.8) (layers F.Cu F.Paste F.Mask))\n'
+                   for i in range(pins))
+    return (f'(module easyeda2kicad:{name} (layer F.Cu) (tedit 5DC5F6A4)\n'
+            f'  (attr smd)\n  (fp_text reference REF** (at 0 -2) (layer F.SilkS))\n'
+            f'  (fp_text value {name} (at 0 2) (layer F.Fab))\n{pads}'
+            f'  (model "{model_path}"\n    (offset (xyz 0 0 0))\n    (scale (xyz 1 1 1))\n'
+            f'    (rotate (xyz 0 0 0))\n  )\n)\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="easyeda2kicad")
+    parser.add_argument("--lcsc_id", required=True)
+    parser.add_argument("--symbol", action="store_true")
+    parser.add_argument("--footprint", action="store_true")
+    parser.add_argument("--3d", dest="model", action="store_true")
+    parser.add_argument("--full", action="store_true")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args(argv)
+    print("-- easyeda2kicad.py v0.8.0 (benchmark stub) --")
+    api = EasyedaApi()
+    cad = api.get_cad_data_of_component(lcsc_id=args.lcsc_id)
+    if not cad:
+        logging.error(f"Failed to fetch data from EasyEDA API for part {args.lcsc_id}")
+        return 1
+    name, pins, out = cad["name"], cad["pins"], args.output
+    if args.full or args.symbol:
+        with open(out + ".kicad_sym", "w") as f:
+            f.write(symbol_text(args.lcsc_id, name, pins))
+        print(f"[INFO] Created Kicad symbol for ID : {args.lcsc_id}")
+    if args.full or args.footprint:
+        os.makedirs(out + ".pretty", exist_ok=True)
+        with open(os.path.join(out + ".pretty", name + ".kicad_mod"), "w") as f:
+            f.write(footprint_text(name, pins, f"{out}.3dshapes/{name}.wrl"))
+        print(f"[INFO] Created Kicad footprint for ID: {args.lcsc_id}")
+    if args.full or args.model:
+        wrl = api.get_raw_3d_model_obj(uuid=cad["uuid"])
+        step = api.get_step_3d_model(uuid=cad["uuid"])
+        os.makedirs(out + ".3dshapes", exist_ok=True)
+        with open(os.path.join(out + ".3dshapes", name + ".wrl"), "w") as f:
+            f.write(wrl)
+        with open(os.path.join(out + ".3dshapes", name + ".step"), "wb") as f:
+            f.write(step)
+        print(f"[INFO] Created 3D model for ID: {args.lcsc_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,29 @@
+import os
+import time
+
+# Seconds every simulated EasyEDA/LCSC API call takes
+LATENCY = float(os.environ.get("STUB_EASYEDA_LATENCY", "0.05"))
+
+# Packages shared by many parts, as in a real BOM: (name, pin count)
+PACKAGES = [("R0402", 2), ("R0603", 2), ("C0805", 2), ("SOT-23", 3), ("SOT-23-5", 5), ("SOIC-8", 8),
+            ("TSSOP-20", 20), ("QFN-32", 32), ("LQFP-48", 48), ("LQFP-64", 64)]
+
+
+class EasyedaApi:
+    def get_cad_data_of_component(self, lcsc_id):
+        time.sleep(LATENCY)
+        number = int(lcsc_id[1:])
+        if str(number).endswith("999"):
+            return {}  # Unknown part, like an empty API answer
+        name, pins = PACKAGES[number % len(PACKAGES)]
+        return {"lcsc_id": lcsc_id, "name": name, "pins": pins, "uuid": f"3d{number % len(PACKAGES):04d}"}
+
+    def get_raw_3d_model_obj(self, uuid):
+        time.sleep(LATENCY)
+        return "".join(f"v {i * 0.01:.4f} {i * 0.02:.4f} {i * 0.03:.4f}\n" for i in range(400)) + f"# {uuid}\n"
+
+    def get_step_3d_model(self, uuid):
+        time.sleep(LATENCY)
+        return ("ISO-10303-21;\nHEADER;\nENDSEC;\nDATA;\n"
+                + "".join(f"#{i}=CARTESIAN_POINT('',({i}.,{i * 2}.,{i * 3}.));\n" for i in range(600))
+                + f"ENDSEC;\nEND-ISO-10303-21;\n/* {uuid} */\n").encode()
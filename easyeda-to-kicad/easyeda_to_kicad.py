@@ -1,50 +1,474 @@
 # -*- coding: utf-8 -*-
-from flask import Flask, request, render_template_string, send_from_directory, Response, abort
-import subprocess
 import os
+import json  # Import for reading config file
+
+ADDON_CONFIG_PATH = '/config/addons/local/easyeda_to_kicad_web/config.json'
+SERVER_MODES = ("threaded", "gevent", "development")
+
+
+def configured_server_mode():
+    """SERVER_MODE exported by run.sh, else the server_mode add-on option, else the threaded server."""
+    mode = os.environ.get("SERVER_MODE")
+    if not mode:
+        try:
+            with open(ADDON_CONFIG_PATH, 'r') as f:
+                mode = json.load(f).get('server_mode')
+        except (OSError, ValueError):
+            mode = None
+    return mode if mode in SERVER_MODES else "threaded"
+
+
+# The serving mode is decided before anything else is imported: in gevent mode the standard
+# library is monkey-patched, so SSE clients, subprocess pipes and the worker pool wait on
+# greenlets instead of each holding an OS thread. Everything then shares one OS thread, and
+# blocking disk work (SQLite, fsync, hashing, symbol shard rewrites, export compression) stalls
+# all other requests while it runs, so the default is a threaded production server (cheroot),
+# with the Werkzeug development server only as a fallback.
+SERVER_MODE = configured_server_mode()
+SERVER_MODE_ERROR = None
+GEVENT_PATCHED = False
+if SERVER_MODE == "gevent" and __name__ == '__main__':
+    try:
+        from gevent import monkey
+        monkey.patch_all()
+        GEVENT_PATCHED = True
+    except ImportError as e:
+        SERVER_MODE, SERVER_MODE_ERROR = "threaded", str(e)
+
+from flask import Flask, request, render_template_string, send_from_directory, send_file, Response, abort, jsonify
+from werkzeug.sansio import multipart
+import subprocess
+import sys
 import csv
 import re
 import logging
+import logging.handlers
+import atexit
 import time
 import threading
 import shutil
-import glob
-from datetime import datetime, timedelta
-from queue import Queue
-from collections import defaultdict
-import json  # Import for reading config file
+import sqlite3
+import errno
+import hashlib
+import copy
+import uuid
+import zipfile
+import tarfile
+from datetime import datetime
+from queue import Queue, Empty
+import itertools
+import heapq
+import random
+import contextlib
+import codecs
+import io
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # Optional: without watchdog the library state is kept current by polling
+    Observer = None
+    FileSystemEventHandler = object
 
 app = Flask(__name__)
 
 # Configuration (Read from Home Assistant config)
-OUTPUT_BASE = "/share/easyeda_output"
+OUTPUT_BASE = os.environ.get("EASYEDA_OUTPUT_BASE", "/share/easyeda_output")  # Overridable for benchmarks
 LIBRARY_ROOT_NAME = "library"
 LIB_PREFIX = "easyeda_lib"
 CLEANUP_DAYS = 7
 DEFAULT_LIBRARY_NAME = f"{LIB_PREFIX}_default"
 DISABLE_CLEANUP = False  # Initial default, will be updated from config
+PAGE_SIZE = 20  # Entries per page of the file listing
+DISK_QUOTA_MB = 0  # Evict least recently downloaded parts above this much library data, 0 disables the quota
+MAX_PARALLEL_CONVERSIONS = 4
+UPSTREAM_RATE_LIMIT = 2.0  # Conversions started per second, 0 disables the limit
+MAX_RETRIES = 3  # Extra attempts for a part that failed on a network error or a crashed worker
+WORKER_MAX_JOBS = 50  # Recycle a converter worker process after this many parts
+WORKER_MAX_RSS_MB = 300  # ... or once its resident memory grows past this
+COMPONENT_CACHE_DIR = os.path.join(OUTPUT_BASE, "cache")
+CACHE_TTL_DAYS = 30
+CACHE_MAX_MB = 500  # 0 disables the component cache
+OFFLINE_MODE = False  # Convert purely from the component cache
+DEFER_3D_MODELS = True  # Commit symbol and footprint first, fetch 3D models in a background stage
+MAX_PARALLEL_3D_DOWNLOADS = 1
+LOG_LEVEL = "INFO"
 
-# Logging setup
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('converter.log'),
-        logging.StreamHandler()
-    ]
-)
+# Logging setup: a logger call only puts the record on a queue (logging.handlers.QueueHandler).
+# A QueueListener thread formats it and does the console, log file and /logs broker output, so
+# request and conversion threads never wait on the disk. The log file is rotated by size.
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+LOG_DIR = os.path.join(OUTPUT_BASE, "logs")
+LOG_FILE_MAX_MB = 10
+LOG_FILE_BACKUPS = 5
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 logger = logging.getLogger(__name__)
-log_queue = Queue()
+LOG_BUFFER_LINES = 2000  # Lines kept for /logs subscribers and Last-Event-ID resume
+LOG_REPLAY_LINES = 200  # Recent lines sent to a subscriber that connects without Last-Event-ID
+log_context = threading.local()  # .job_id/.item_id tag log lines and trace spans with the job and part being worked on
+
+
+class LogBroker:
+    """Broadcasts log lines to every /logs subscriber.
 
+    Lines go into a bounded ring buffer under increasing sequence numbers. Each subscriber keeps
+    its own cursor (the last sequence number it has seen) and blocks until newer lines arrive,
+    so clients no longer steal each other's lines and an idle add-on does not grow a backlog.
+    Lines are tagged with a channel (the job ID) so a client can follow a single batch.
+    """
+
+    def __init__(self, capacity):
+        self.lines = deque(maxlen=capacity)
+        self.last_seq = 0
+        self.subscribers = 0
+        self.condition = threading.Condition()
+
+    def publish(self, line, channel=None):
+        if channel is None:
+            channel = getattr(log_context, "job_id", None)
+        with self.condition:
+            self.last_seq += 1
+            self.lines.append((self.last_seq, channel, line))
+            self.condition.notify_all()
+
+    def read(self, cursor, channel=None, timeout=15):
+        """Wait up to timeout for lines after cursor. Returns (new_cursor, [(seq, line), ...])."""
+        with self.condition:
+            if self.last_seq <= cursor:
+                self.condition.wait(timeout)
+            first_seq = self.last_seq - len(self.lines) + 1
+            start = max(0, cursor + 1 - first_seq)
+            new_lines = [(seq, line) for seq, line_channel, line in itertools.islice(self.lines, start, None)
+                         if channel is None or line_channel == channel]
+            return self.last_seq, new_lines
+
+    def replay_cursor(self, lines):
+        with self.condition:
+            return max(0, self.last_seq - lines)
+
+
+log_broker = LogBroker(LOG_BUFFER_LINES)
+
+
+class LogBrokerHandler(logging.Handler):
+    """Publishes records to the /logs subscribers, on the channel of the job that logged them."""
 
-class QueueHandler(logging.Handler):
     def emit(self, record):
-        log_entry = self.format(record)
-        log_entry_cleaned = re.sub(r'\x1b\[[0-9;]*[mK]', '', log_entry)
-        log_queue.put(log_entry_cleaned)
+        log_broker.publish(self.format(record), channel=getattr(record, "job_id", None))
+
+
+class LogContextFilter(logging.Filter):
+    """Copies the job of the logging thread onto the record, before it is handed to the listener thread."""
+
+    def filter(self, record):
+        record.job_id = getattr(log_context, "job_id", None)
+        return True
+
+
+def setup_logging():
+    formatter = logging.Formatter(LOG_FORMAT)
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+    handlers = [console_handler, LogBrokerHandler()]
+    file_error = None
+    try:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(os.path.join(LOG_DIR, "converter.log"),
+                                                            maxBytes=LOG_FILE_MAX_MB * 1024 * 1024,
+                                                            backupCount=LOG_FILE_BACKUPS, encoding='utf-8')
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    except OSError as e:
+        file_error = e
+    record_queue = Queue()
+    queue_handler = logging.handlers.QueueHandler(record_queue)
+    queue_handler.addFilter(LogContextFilter())
+    root_logger = logging.getLogger()
+    root_logger.setLevel(LOG_LEVEL)
+    root_logger.addHandler(queue_handler)
+    listener = logging.handlers.QueueListener(record_queue, *handlers)
+    listener.start()
+    atexit.register(listener.stop)  # Flushes the queue on exit
+    if file_error:
+        logger.warning(f"Could not open the log file in {LOG_DIR} ({file_error}), logging to the console only.")
+    return listener
+
+
+log_listener = setup_logging()
+
+
+# Prometheus metrics in the text exposition format, served at /metrics. Kept dependency-free:
+# each metric holds its samples per label-value tuple behind a lock, gauges can instead be
+# computed by a callback when they are scraped.
+metrics_registry = []
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+class Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+        metrics_registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+        for key, value in sorted(values.items()):
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(f"{name}{format_labels(labels)} {value!r}" for name, labels, value in self.samples())
+        return lines
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    metric_type = "gauge"
+
+    def __init__(self, name, help_text, labelnames=(), function=None):
+        super().__init__(name, help_text, labelnames)
+        self.function = function
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.function is None:
+            yield from super().samples()
+            return
+        try:
+            yield self.name, {}, self.function()
+        except Exception as e:
+            logger.debug(f"Metric {self.name} unavailable: {e}")
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=(0.1, 0.5, 1, 5, 10, 30, 60)):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            counts, total = self.values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))] += 1
+            self.values[key] = (counts, total + value)
+
+    def samples(self):
+        with self.lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self.values.items()}
+        for key, (counts, total) in sorted(values.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", dict(labels, le="+Inf" if bound == float("inf") else f"{bound:g}"), cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+def render_metrics():
+    lines = []
+    for metric in metrics_registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+PARTS_TOTAL = Counter("easyeda_parts_total", "LCSC IDs handled, by result (processed, skipped, failed).", ("result",))
+CONVERSION_SECONDS = Histogram("easyeda_conversion_duration_seconds", "Time to convert and commit one part.",
+                               ("result",), buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300))
+STAGE_SECONDS = Histogram("easyeda_stage_duration_seconds",
+                          "Time spent per pipeline stage (upstream_fetch, worker_spawn, easyeda2kicad, "
+                          "organize_files, cleanup).", ("stage",),
+                          buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300))
+ARTIFACT_BYTES = Histogram("easyeda_artifact_bytes", "Size of artifacts committed into libraries, by kind and outcome.",
+                           ("kind", "outcome"), buckets=(1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216))
+CACHE_REQUESTS = Counter("easyeda_component_cache_requests_total",
+                         "Component cache lookups of the converter workers, by result (hit, miss).", ("result",))
+ACTIVE_CONVERSIONS = Gauge("easyeda_active_conversions", "Parts being converted right now.")
+PART_RETRIES = Counter("easyeda_part_retries_total",
+                       "Conversions retried after a transient failure, by reason (transient, worker).", ("reason",))
+
 
+def component_cache_hit_ratio():
+    hits, misses = CACHE_REQUESTS.value(result="hit"), CACHE_REQUESTS.value(result="miss")
+    return hits / (hits + misses) if hits + misses else 0
 
-logging.getLogger().addHandler(QueueHandler())
+
+Gauge("easyeda_component_cache_hit_ratio", "Share of component cache lookups served from the cache.",
+      function=component_cache_hit_ratio)
+Gauge("easyeda_sse_subscribers", "Open /logs event streams.", function=lambda: log_broker.subscribers)
+Gauge("easyeda_log_queue_records", "Log records waiting for the logging thread to write them out.",
+      function=lambda: log_listener.queue.qsize())
+
+
+# Per-job timeline tracing. Spans are recorded against the job and part the current thread is
+# working on (log_context), kept in memory while the job runs and written to JOBS_DIR/traces
+# when it ends. /jobs/<id>/timeline draws them as a waterfall and /jobs/<id>/trace exports them
+# in the Chrome trace event format (chrome://tracing, Perfetto).
+TRACE_SPAN_LIMIT = 50000  # Spans kept per job
+
+
+class JobTracer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.spans = {}
+        self.dropped = defaultdict(int)
+
+    def record(self, name, start, duration, job_id=None, item_id=None, **args):
+        """Add a span (wall-clock start and duration in seconds) to a job, by default the current one."""
+        job_id = job_id or getattr(log_context, "job_id", None)
+        if job_id is None:
+            return
+        if item_id is None:
+            item_id = getattr(log_context, "item_id", None)
+        span = {"name": name, "item": item_id, "start": start, "duration": duration,
+                "thread": threading.current_thread().name}
+        if args:
+            span["args"] = args
+        with self.lock:
+            spans = self.spans.setdefault(job_id, [])
+            if len(spans) < TRACE_SPAN_LIMIT:
+                spans.append(span)
+            else:
+                self.dropped[job_id] += 1
+
+    def finish(self, name, duration, **args):
+        """Record a span of duration seconds that ends now."""
+        self.record(name, time.time() - duration, duration, **args)
+
+    @contextlib.contextmanager
+    def span(self, name, **args):
+        started = time.time()
+        try:
+            yield
+        finally:
+            self.record(name, started, time.time() - started, **args)
+
+    @staticmethod
+    def trace_path(job_id):
+        return os.path.join(JOBS_DIR, "traces", f"{job_id}.json")
+
+    def save(self, job_id):
+        """Move a finished job's spans from memory to disk."""
+        with self.lock:
+            spans = self.spans.pop(job_id, None)
+            dropped = self.dropped.pop(job_id, 0)
+        if spans is None:
+            return
+        if dropped:
+            logger.warning(f"Job {job_id}: trace limit reached, {dropped} spans were dropped")
+        path = self.trace_path(job_id)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", 'w') as f:
+                json.dump(spans, f)
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            logger.error(f"Error saving trace of job {job_id}: {e}", exc_info=True)
+
+    def get(self, job_id):
+        """Spans of a job, or None if it has no trace."""
+        with self.lock:
+            if job_id in self.spans:
+                return list(self.spans[job_id])
+        try:
+            with open(self.trace_path(job_id), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def discard(self, job_id):
+        with self.lock:
+            self.spans.pop(job_id, None)
+            self.dropped.pop(job_id, None)
+        try:
+            os.remove(self.trace_path(job_id))
+        except FileNotFoundError:
+            pass
+
+
+job_tracer = JobTracer()
+
+
+def load_addon_config():
+    """Read the add-on options and apply them to the module-level settings."""
+    global DISABLE_CLEANUP, MAX_PARALLEL_CONVERSIONS, UPSTREAM_RATE_LIMIT, WORKER_MAX_JOBS, WORKER_MAX_RSS_MB
+    global CACHE_TTL_DAYS, CACHE_MAX_MB, OFFLINE_MODE, PAGE_SIZE, DISK_QUOTA_MB, CLEANUP_DAYS, LOG_LEVEL
+    global MAX_RETRIES, DEFER_3D_MODELS, MAX_PARALLEL_3D_DOWNLOADS
+    try:
+        if os.path.exists(ADDON_CONFIG_PATH):
+            with open(ADDON_CONFIG_PATH, 'r') as f:
+                addon_config = json.load(f)
+            DISABLE_CLEANUP = addon_config.get('disable_auto_cleanup', False)
+            CLEANUP_DAYS = float(addon_config.get('cleanup_days', CLEANUP_DAYS))
+            PAGE_SIZE = max(1, int(addon_config.get('page_size', PAGE_SIZE)))
+            DISK_QUOTA_MB = int(addon_config.get('disk_quota_mb', DISK_QUOTA_MB))
+            MAX_PARALLEL_CONVERSIONS = max(1, int(addon_config.get('max_parallel_conversions',
+                                                                   MAX_PARALLEL_CONVERSIONS)))
+            UPSTREAM_RATE_LIMIT = float(addon_config.get('upstream_rate_limit', UPSTREAM_RATE_LIMIT))
+            MAX_RETRIES = max(0, int(addon_config.get('max_retries', MAX_RETRIES)))
+            WORKER_MAX_JOBS = int(addon_config.get('worker_max_jobs', WORKER_MAX_JOBS))
+            WORKER_MAX_RSS_MB = int(addon_config.get('worker_max_rss_mb', WORKER_MAX_RSS_MB))
+            CACHE_TTL_DAYS = float(addon_config.get('cache_ttl_days', CACHE_TTL_DAYS))
+            CACHE_MAX_MB = int(addon_config.get('cache_max_mb', CACHE_MAX_MB))
+            OFFLINE_MODE = addon_config.get('offline_mode', OFFLINE_MODE)
+            DEFER_3D_MODELS = addon_config.get('defer_3d_models', DEFER_3D_MODELS)
+            MAX_PARALLEL_3D_DOWNLOADS = max(1, int(addon_config.get('max_parallel_3d_downloads',
+                                                                    MAX_PARALLEL_3D_DOWNLOADS)))
+            log_level = str(addon_config.get('log_level', LOG_LEVEL)).upper()
+            if log_level in LOG_LEVELS:
+                LOG_LEVEL = log_level
+                logging.getLogger().setLevel(LOG_LEVEL)
+            else:
+                logger.warning(f"Unknown log_level '{log_level}', keeping {LOG_LEVEL}.")
+            logger.info(f"Automatic cleanup is {'disabled' if DISABLE_CLEANUP else 'enabled'} based on config.")
+        else:
+            logger.warning(f"Configuration file not found at: {ADDON_CONFIG_PATH}. Using default settings.")
+    except Exception as e:
+        logger.error(f"Error reading add-on configuration: {e}", exc_info=True)
+        logger.warning("Using default settings.")
+
+
+load_addon_config()
 
 # HTML Template (Removed the disable cleanup checkbox)
 HTML = """<!doctype html>
@@ -259,6 +683,78 @@ HTML = """<!doctype html>
                 });
             }
 
+            // Poll the background job until it has finished
+            const jobCard = document.getElementById('job-card');
+            if (jobCard) {
+                const jobId = jobCard.dataset.jobId;
+                const showResults = function(key, values) {
+                    const el = document.getElementById('results-' + key);
+                    el.querySelector('span').textContent = values.join(', ');
+                    el.style.display = values.length ? '' : 'none';
+                };
+                const pollJob = function() {
+                    fetch('/jobs/' + jobId).then(function(response) {
+                        return response.json();
+                    }).then(function(job) {
+                        document.getElementById('job-status').textContent =
+                            job.status + ' (' + job.progress.done + '/' + job.progress.total + ' parts done)';
+                        ['processed', 'skipped', 'failed', 'warnings'].forEach(function(key) {
+                            showResults(key, job.results[key]);
+                        });
+                        if (job.status === 'queued' || job.status === 'running') {
+                            setTimeout(pollJob, 2000);
+                        }
+                    }).catch(function(err) {
+                        console.error("Job status poll failed:", err);
+                        setTimeout(pollJob, 5000);
+                    });
+                };
+                if (jobCard.dataset.jobStatus === 'queued' || jobCard.dataset.jobStatus === 'running') {
+                    pollJob();
+                }
+            }
+
+            // Search as you type
+            const searchInput = document.getElementById('search');
+            const searchResults = document.getElementById('search-results');
+            let searchTimer = null;
+            searchInput.addEventListener('input', function() {
+                clearTimeout(searchTimer);
+                searchTimer = setTimeout(function() {
+                    const query = searchInput.value.trim();
+                    if (!query) {
+                        searchResults.innerHTML = '';
+                        return;
+                    }
+                    fetch('/search?q=' + encodeURIComponent(query)).then(function(response) {
+                        return response.json();
+                    }).then(function(data) {
+                        const pre = document.createElement('pre');
+                        data.results.forEach(function(part) {
+                            const line = document.createElement('div');
+                            const fields = part.fields;
+                            line.textContent = part.lcsc_id + '  ' + [fields.symbol, fields.value, fields.mpn, fields.package]
+                                .filter(Boolean).map(function(values) { return values.join(', '); }).join(' | ') +
+                                '  [' + part.library + ']  ';
+                            part.files.forEach(function(file) {
+                                const link = document.createElement('a');
+                                link.href = file.url;
+                                link.textContent = file.name;
+                                line.appendChild(link);
+                                line.appendChild(document.createTextNode(' '));
+                            });
+                            pre.appendChild(line);
+                        });
+                        if (!data.results.length) {
+                            pre.textContent = '    No matching parts';
+                        }
+                        searchResults.replaceChildren(pre);
+                    }).catch(function(err) {
+                        console.error("Search failed:", err);
+                    });
+                }, 200);
+            });
+
             // Live logs with server-sent events
             const logsDiv = document.getElementById('logs');
             if (logsDiv) { // Add check
@@ -270,12 +766,8 @@ HTML = """<!doctype html>
                     logsDiv.scrollTop = logsDiv.scrollHeight;
                 };
                 evtSource.onerror = function(err) {
-                    console.error("EventSource failed:", err);
-                    if (logsDiv) {
-                        // logsDiv.innerHTML += "<div>Log stream connection error. Please refresh.</div>";
-                        // logsDiv.scrollTop = logsDiv.scrollHeight;
-                    }
-                    evtSource.close(); // Close the connection on error
+                    // The browser reconnects by itself and resumes after the last received line (Last-Event-ID)
+                    console.error("EventSource failed, reconnecting:", err);
                 };
             }
         });
@@ -311,20 +803,15 @@ HTML = """<!doctype html>
         </div>
 
         {% if processing_results %}
-        <div class="card">
+        <div class="card"{% if job %} id="job-card" data-job-id="{{ job.id }}" data-job-status="{{ job.status }}"{% endif %}>
             <h3><i class="fas fa-check-circle"></i> Processing Results</h3>
-            {% if processing_results.processed %}
-            <p class="status-message status-success"><i class="fas fa-check"></i> Successfully processed: {{ ', '.join(processing_results.processed) }}</p>
-            {% endif %}
-            {% if processing_results.skipped %}
-            <p class="status-message status-duplicate"><i class="fas fa-exclamation-triangle"></i> Skipped (already processed): {{ ', '.join(processing_results.skipped) }}</p>
-            {% endif %}
-            {% if processing_results.failed %}
-            <p class="status-message status-error"><i class="fas fa-times-circle"></i> Failed: {{ ', '.join(processing_results.failed) }}</p>
-            {% endif %}
-            {% if processing_results.warnings %}
-            <p class="status-message status-warning"><i class="fas fa-exclamation-circle"></i> Warnings: {{ ', '.join(processing_results.warnings) }}</p>
+            {% if job %}
+            <div class="info-message"><i class="fas fa-tasks"></i> Job <strong>{{ job.id }}</strong>: <span id="job-status">{{ job.status }} ({{ job_progress.done }}/{{ job_progress.total }} parts done)</span> - <a href="/jobs/{{ job.id }}/timeline">Timeline</a> | <a href="/jobs/{{ job.id }}/trace">Chrome trace</a></div>
             {% endif %}
+            <p id="results-processed" class="status-message status-success"{% if not processing_results.processed %} style="display: none;"{% endif %}><i class="fas fa-check"></i> Successfully processed: <span>{{ ', '.join(processing_results.processed) }}</span></p>
+            <p id="results-skipped" class="status-message status-duplicate"{% if not processing_results.skipped %} style="display: none;"{% endif %}><i class="fas fa-exclamation-triangle"></i> Skipped (already processed): <span>{{ ', '.join(processing_results.skipped) }}</span></p>
+            <p id="results-failed" class="status-message status-error"{% if not processing_results.failed %} style="display: none;"{% endif %}><i class="fas fa-times-circle"></i> Failed: <span>{{ ', '.join(processing_results.failed) }}</span></p>
+            <p id="results-warnings" class="status-message status-warning"{% if not processing_results.warnings %} style="display: none;"{% endif %}><i class="fas fa-exclamation-circle"></i> Warnings: <span>{{ ', '.join(processing_results.warnings) }}</span></p>
         </div>
         {% elif output %}
         <div class="card">
@@ -332,7 +819,14 @@ HTML = """<!doctype html>
         </div>
         {% endif %}
 
+        <h3><i class="fas fa-search"></i> Search Libraries</h3>
+        <div class="card">
+            <input type="text" id="search" placeholder="LCSC ID, symbol, value, MPN or footprint">
+            <div id="search-results" class="directory-listing"></div>
+        </div>
+
         <h3><i class="fas fa-folder-open"></i> Files in: {{ current_display_path }}</h3>
+        <p>Download library <strong>{{ current_library }}</strong>: <a href="/export/{{ current_library }}">ZIP</a> | <a href="/export/{{ current_library }}?format=tar.gz">tar.gz</a></p>
         <div class="card">
             <div class="directory-listing">
                 {{ directory_listing_html | safe }}
@@ -347,8 +841,904 @@ HTML = """<!doctype html>
 """
 
 
-def organize_files(temp_output_prefix, library_dir):
-    logger.info(f"--- Starting file organization (New Logic) ---")
+# Merged symbol libraries: every library folder gets one <library>.kicad_sym (plus
+# <library>_2.kicad_sym, ... once a shard holds SYMBOLS_PER_SHARD symbols) instead of one
+# file per converted part, so KiCad only has a handful of sym-lib entries to load.
+SYMBOLS_PER_SHARD = 500
+SYMBOL_INDEX_NAME = ".symbol_index.json"
+
+
+def split_kicad_sym(data):
+    """Find the top-level (symbol ...) blocks of a .kicad_sym file given as bytes.
+
+    Returns (header_end, [(name, start, end), ...]) where header_end is the offset of the
+    line holding the first symbol (or the closing parenthesis of an empty library).
+    """
+    symbols = []
+    depth = 0
+    in_string = False
+    escaped = False
+    start = None
+    for pos, byte in enumerate(data):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif byte == 0x5C:  # backslash
+                escaped = True
+            elif byte == 0x22:  # double quote
+                in_string = False
+        elif byte == 0x22:
+            in_string = True
+        elif byte == 0x28:  # (
+            depth += 1
+            if depth == 2:
+                start = pos
+        elif byte == 0x29:  # )
+            if depth == 2 and data.startswith(b"(symbol", start):
+                name_match = re.match(rb'\(symbol\s+"((?:[^"\\]|\\.)*)"', data[start:start + 1024])
+                if name_match:
+                    symbols.append((name_match.group(1).decode('utf-8'), start, pos + 1))
+            depth -= 1
+    first_offset = symbols[0][1] if symbols else data.rfind(b")")
+    return data.rfind(b"\n", 0, max(first_offset, 0)) + 1, symbols
+
+
+SYMBOL_PROPERTY_RE = re.compile(rb'\(property\s+"((?:[^"\\]|\\.)*)"\s+"((?:[^"\\]|\\.)*)"')
+
+
+def symbol_properties(block):
+    """Property name -> value of a (symbol ...) block given as bytes."""
+    return {name.decode('utf-8', 'replace'): re.sub(rb'\\(.)', rb'\1', value).decode('utf-8', 'replace')
+            for name, value in SYMBOL_PROPERTY_RE.findall(block)}
+
+
+class SymbolLibrary:
+    """Merged, sharded .kicad_sym library of one library folder.
+
+    The index records the byte range of every symbol, so inserting or replacing a symbol
+    copies the untouched ranges of a single shard instead of re-parsing it. Shards are written
+    to a temporary file and swapped in with os.replace, so readers never see a partial library.
+    """
+
+    def __init__(self, symbols_dir, library_name):
+        self.symbols_dir = symbols_dir
+        self.library_name = library_name
+        self.index_path = os.path.join(symbols_dir, SYMBOL_INDEX_NAME)
+        self.shard_pattern = re.compile(rf"^{re.escape(library_name)}(_\d+)?\.kicad_sym$")
+        self.lock = threading.Lock()
+        self.index = self._load_index()
+
+    def _shard_number(self, shard_name):
+        suffix = self.shard_pattern.match(shard_name).group(1)
+        return int(suffix[1:]) if suffix else 1
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            index = {"shards": {}}
+        except (ValueError, OSError) as e:
+            logger.warning(f"Symbol index {self.index_path} is unreadable ({e}), rebuilding it.")
+            index = {"shards": {}}
+        on_disk = set()
+        if os.path.isdir(self.symbols_dir):
+            on_disk = {name for name in os.listdir(self.symbols_dir) if self.shard_pattern.match(name)}
+        for shard_name in list(index["shards"]):
+            if shard_name not in on_disk:
+                del index["shards"][shard_name]
+        changed = False
+        for shard_name in on_disk:
+            path = os.path.join(self.symbols_dir, shard_name)
+            entry = index["shards"].get(shard_name)
+            if not entry or entry["size"] != os.path.getsize(path):
+                index["shards"][shard_name] = self._scan_shard(path)
+                changed = True
+        if changed:
+            self.index = index
+            self._save_index()
+        return index
+
+    def _scan_shard(self, path):
+        logger.info(f"Indexing symbol library {os.path.relpath(path, OUTPUT_BASE)}")
+        with open(path, 'rb') as f:
+            data = f.read()
+        header_end, found = split_kicad_sym(data)
+        return {"size": len(data), "header_end": header_end,
+                "symbols": {name: [start, end - start] for name, start, end in found}}
+
+    def _save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def shard_of(self, symbol_name):
+        for shard_name, entry in self.index["shards"].items():
+            if symbol_name in entry["symbols"]:
+                return shard_name
+        return None
+
+    def _shard_with_room(self, pending):
+        if self.index["shards"]:
+            shard_name = max(self.index["shards"], key=self._shard_number)
+            if len(self.index["shards"][shard_name]["symbols"]) + pending.get(shard_name, 0) < SYMBOLS_PER_SHARD:
+                return shard_name
+            number = self._shard_number(shard_name) + 1
+        else:
+            number = 1
+        return f"{self.library_name}.kicad_sym" if number == 1 else f"{self.library_name}_{number}.kicad_sym"
+
+    def _rewrite_shard(self, shard_name, default_header, new_blocks, removed=()):
+        path = os.path.join(self.symbols_dir, shard_name)
+        entry = self.index["shards"].get(shard_name)
+        skip = set(removed) | {name for name, _ in new_blocks}
+        symbols = {}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as out:
+            if entry:
+                with open(path, 'rb') as src:
+                    out.write(src.read(entry["header_end"]))
+                    header_end = out.tell()
+                    for name, (start, length) in sorted(entry["symbols"].items(), key=lambda item: item[1][0]):
+                        if name in skip:
+                            continue
+                        src.seek(start)
+                        out.write(b"  ")
+                        symbols[name] = [out.tell(), length]
+                        out.write(src.read(length) + b"\n")
+            else:
+                out.write(default_header)
+                header_end = out.tell()
+            for name, block in new_blocks:
+                out.write(b"  ")
+                symbols[name] = [out.tell(), len(block)]
+                out.write(block + b"\n")
+            out.write(b")\n")
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, path)
+        self.index["shards"][shard_name] = {"size": os.path.getsize(path), "header_end": header_end,
+                                            "symbols": symbols}
+        return path
+
+    def add_file(self, source_path):
+        """Merge every symbol of a .kicad_sym file into the library.
+
+        Returns one dict per merged symbol with its name, shard path, size, sha256 and properties.
+        """
+        with open(source_path, 'rb') as f:
+            data = f.read()
+        header_end, found = split_kicad_sym(data)
+        if not found:
+            return []
+        header = data[:header_end].rstrip() + b"\n"
+        with self.lock:
+            os.makedirs(self.symbols_dir, exist_ok=True)
+            by_shard = defaultdict(list)
+            pending = defaultdict(int)
+            for name, start, end in found:
+                shard_name = self.shard_of(name) or self._shard_with_room(pending)
+                if shard_name not in self.index["shards"] or name not in self.index["shards"][shard_name]["symbols"]:
+                    pending[shard_name] += 1
+                else:
+                    logger.warning(f"    Replacing existing symbol {name} in {shard_name}")
+                by_shard[shard_name].append((name, data[start:end]))
+            merged = []
+            for shard_name, blocks in by_shard.items():
+                path = self._rewrite_shard(shard_name, header, blocks)
+                merged.extend({"name": name, "path": path, "size": len(block),
+                               "sha256": hashlib.sha256(block).hexdigest(),
+                               "properties": symbol_properties(block)} for name, block in blocks)
+            self._save_index()
+        return merged
+
+    def read_symbol(self, symbol_name):
+        """The (symbol ...) block of a merged symbol as bytes, or None if the library lacks it."""
+        with self.lock:
+            shard_name = self.shard_of(symbol_name)
+            if not shard_name:
+                return None
+            start, length = self.index["shards"][shard_name]["symbols"][symbol_name]
+            with open(os.path.join(self.symbols_dir, shard_name), 'rb') as f:
+                f.seek(start)
+                return f.read(length)
+
+    def total_size(self):
+        with self.lock:
+            return sum(entry["size"] for entry in self.index["shards"].values())
+
+    def remove(self, symbol_names):
+        """Drop symbols from the library. Returns the names that were found and removed."""
+        removed = []
+        with self.lock:
+            for shard_name, entry in list(self.index["shards"].items()):
+                names = [name for name in symbol_names if name in entry["symbols"]]
+                if names:
+                    self._rewrite_shard(shard_name, b"", [], removed=names)
+                    removed.extend(names)
+            if removed:
+                self._save_index()
+        return removed
+
+
+symbol_libraries = {}
+symbol_libraries_lock = threading.Lock()
+
+
+def get_symbol_library(library_dir):
+    with symbol_libraries_lock:
+        if library_dir not in symbol_libraries:
+            symbol_libraries[library_dir] = SymbolLibrary(os.path.join(library_dir, "symbols"),
+                                                          os.path.basename(library_dir))
+        return symbol_libraries[library_dir]
+
+
+# Content-addressed store for footprints and 3D models. Library files are hard links to a
+# blob named after the SHA-256 of its (normalized) content, so identical artifacts shared
+# by many parts are stored once and re-committing one is a no-op.
+BLOB_STORE_DIR = os.path.join(OUTPUT_BASE, "blobs")
+
+
+class BlobStore:
+    def __init__(self, root):
+        self.root = root
+        self.stats_path = os.path.join(root, ".stats.json")
+        self.lock = threading.Lock()
+        # Serializes storing a new blob and linking to it across libraries (library_commit_locks are
+        # per library), so a blob is stored and counted once and garbage collection cannot remove it
+        # between the existence check and the link.
+        self.blob_lock = threading.Lock()
+        self.stats = {"files_committed": 0, "files_deduplicated": 0, "logical_bytes": 0, "stored_bytes": 0}
+        try:
+            with open(self.stats_path, 'r') as f:
+                self.stats.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not read blob store stats {self.stats_path}: {e}")
+
+    def blob_path(self, digest, extension):
+        return os.path.join(self.root, digest[:2], digest + extension)
+
+    def _record(self, size, stored, deduplicated):
+        with self.lock:
+            self.stats["files_committed"] += 1
+            self.stats["files_deduplicated"] += int(deduplicated)
+            self.stats["logical_bytes"] += size
+            self.stats["stored_bytes"] += size if stored else 0
+            self._save_stats()
+
+    def _save_stats(self):
+        try:
+            with open(self.stats_path + ".tmp", 'w') as f:
+                json.dump(self.stats, f)
+            os.replace(self.stats_path + ".tmp", self.stats_path)
+        except Exception as e:
+            logger.warning(f"Could not save blob store stats: {e}")
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats["dedupe_ratio"] = round(stats["logical_bytes"] / stats["stored_bytes"], 3) if stats["stored_bytes"] else None
+        return stats
+
+    def commit(self, source_path, dest_path, normalize=None):
+        """Move source_path into the blob store and hard-link dest_path to it.
+
+        normalize, if given, maps the file's bytes to the content that is hashed and stored.
+        Returns (outcome, blob_path) where outcome is "identical" when dest_path already is that
+        blob, "linked" or "copied" otherwise.
+        """
+        if normalize:
+            with open(source_path, 'rb') as f:
+                data = normalize(f.read())
+            digest = hashlib.sha256(data).hexdigest()
+        else:
+            data = None
+            sha = hashlib.sha256()
+            with open(source_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+        blob = self.blob_path(digest, os.path.splitext(dest_path)[1])
+        with self.blob_lock:
+            stored = not os.path.exists(blob)
+            if stored:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                tmp_blob = f"{blob}.{threading.get_ident()}.tmp"
+                if data is not None:
+                    with open(tmp_blob, 'wb') as f:
+                        f.write(data)
+                    os.replace(tmp_blob, blob)
+                else:
+                    # The staging area lives on the same filesystem, so this is a rename, not a copy
+                    try:
+                        os.replace(source_path, blob)
+                    except OSError as e:
+                        if e.errno != errno.EXDEV:
+                            raise
+                        shutil.copyfile(source_path, tmp_blob)
+                        os.replace(tmp_blob, blob)
+            size = os.path.getsize(blob)
+            if os.path.exists(dest_path) and os.path.samefile(dest_path, blob):
+                self._record(size, stored, deduplicated=True)
+                return "identical", blob
+            tmp_dest = f"{dest_path}.{threading.get_ident()}.tmp"
+            try:
+                os.link(blob, tmp_dest)
+                outcome = "linked"
+            except OSError:
+                # Filesystems without hard links (or a blob store on another device) get a plain copy
+                shutil.copyfile(blob, tmp_dest)
+                outcome = "copied"
+        os.replace(tmp_dest, dest_path)
+        self._record(size, stored, deduplicated=not stored)
+        return outcome, blob
+
+    def collect_garbage(self, blob_paths=None):
+        """Remove blobs no library file links to any more. Returns the number removed.
+
+        Only blob_paths are checked when given, otherwise the whole store is scanned.
+        """
+        if blob_paths is None:
+            blob_paths = []
+            if os.path.isdir(self.root):
+                for bucket in os.scandir(self.root):
+                    if bucket.is_dir():
+                        blob_paths.extend(blob.path for blob in os.scandir(bucket.path)
+                                          if not blob.name.endswith(".tmp"))
+        removed = 0
+        for blob_path in blob_paths:
+            try:
+                with self.blob_lock:
+                    stats = os.stat(blob_path)
+                    if stats.st_nlink > 1:
+                        continue
+                    os.remove(blob_path)
+                removed += 1
+                with self.lock:
+                    self.stats["stored_bytes"] = max(0, self.stats["stored_bytes"] - stats.st_size)
+            except FileNotFoundError:
+                continue
+        if removed:
+            with self.lock:
+                self._save_stats()
+        return removed
+
+
+blob_store = BlobStore(BLOB_STORE_DIR)
+
+
+# Per-library catalog of converted parts and the files they produced. The set of LCSC IDs is
+# kept in memory, so duplicate checks never touch the disk; the legacy
+# .processed_lcsc_ids.log of a library is imported the first time its catalog is opened.
+# The catalog also holds the search index of the library: the searchable values of every part
+# (search_terms) in search_fields, with an FTS5 trigram index over them for /search.
+# Catalogs live in OUTPUT_BASE/catalogs rather than in the library folder: the newest folder
+# (by mtime) is the current library, so opening a catalog must not touch the folder.
+CATALOG_DIR = os.path.join(OUTPUT_BASE, "catalogs")
+CATALOG_NAME = ".catalog.sqlite3"  # Inside the library folder, where earlier versions kept it
+LEGACY_PROCESSED_LOG_NAME = ".processed_lcsc_ids.log"
+UNTRACKED_PREFIX = "untracked:"  # Catalog entries of single files found in a library by _import_untracked_files
+SEARCH_INDEX_VERSION = 1  # PRAGMA user_version once the parts of a catalog have been indexed
+SEARCH_FIELDS = ("lcsc_id", "symbol", "value", "mpn", "footprint", "package", "3d_model")
+
+
+def search_terms(lcsc_id, artifacts):
+    """(field, value) pairs a part can be found by: its LCSC ID, symbol names and their Value, MPN
+    and Footprint (package) properties, footprint and 3D model names."""
+    terms = [("lcsc_id", lcsc_id)]
+    for artifact in artifacts:
+        if artifact["kind"] == "symbol":
+            properties = artifact.get("properties", {})
+            terms.append(("symbol", artifact["name"]))
+            terms.append(("value", properties.get("Value")))
+            terms.append(("mpn", properties.get("MPN") or properties.get("Manufacturer Part")))
+            terms.append(("package", properties.get("Footprint", "").rpartition(":")[2]))
+        else:
+            terms.append((artifact["kind"], os.path.splitext(artifact["name"])[0]))
+    unique = []
+    for term in terms:
+        if term[1] and term not in unique:
+            unique.append(term)
+    return unique
+
+
+def catalog_path(library_dir):
+    return os.path.join(CATALOG_DIR, f"{os.path.basename(library_dir)}.sqlite3")
+
+
+@contextlib.contextmanager
+def preserved_mtime(folder):
+    """Restore the times of folder after changing its entries, so it keeps its place in list_library_folders."""
+    stats = os.stat(folder)
+    try:
+        yield
+    finally:
+        os.utime(folder, ns=(stats.st_atime_ns, stats.st_mtime_ns))
+
+
+class PartCatalog:
+    def __init__(self, library_dir):
+        self.library_dir = library_dir
+        self.path = catalog_path(library_dir)
+        self.lock = threading.Lock()
+        os.makedirs(library_dir, exist_ok=True)
+        os.makedirs(CATALOG_DIR, exist_ok=True)
+        self._move_legacy_catalog()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS parts (
+                lcsc_id TEXT PRIMARY KEY,
+                converted_at REAL NOT NULL,
+                duration REAL,
+                job_id TEXT
+            );
+            CREATE TABLE IF NOT EXISTS artifacts (
+                lcsc_id TEXT NOT NULL REFERENCES parts(lcsc_id) ON DELETE CASCADE,
+                kind TEXT NOT NULL,
+                name TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER,
+                sha256 TEXT,
+                PRIMARY KEY (lcsc_id, kind, name)
+            );
+            CREATE INDEX IF NOT EXISTS artifacts_path ON artifacts(path);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value
+            );
+        """)
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self._add_last_access()
+        self._add_models_pending()
+        self._check_library_folder()
+        self._migrate_legacy_log()
+        self.ids = {row[0] for row in self.db.execute("SELECT lcsc_id FROM parts")}
+        self._create_search_index()
+        self._normalize_part_ids()
+        self._import_untracked_files()
+        logger.info(f"Loaded catalog of {len(self.ids)} parts for library '{os.path.basename(library_dir)}'")
+
+    def _move_legacy_catalog(self):
+        legacy_path = os.path.join(self.library_dir, CATALOG_NAME)
+        if not os.path.exists(legacy_path) or os.path.exists(self.path):
+            return
+        with preserved_mtime(self.library_dir):
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(legacy_path + suffix):
+                    shutil.move(legacy_path + suffix, self.path + suffix)
+        logger.info(f"Moved the catalog of library '{os.path.basename(self.library_dir)}' to {self.path}")
+
+    def _check_library_folder(self):
+        """Forget the parts of a library folder that was deleted and created again under the same name."""
+        inode = os.stat(self.library_dir).st_ino
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'library_inode'").fetchone()
+        with self.db:
+            if row and row[0] != inode:
+                logger.warning(f"Library folder '{os.path.basename(self.library_dir)}' was recreated, "
+                               f"starting a new catalog.")
+                self.db.execute("DELETE FROM parts")
+                self.db.execute("DELETE FROM meta WHERE key = 'untracked_imported'")
+                self.db.execute("PRAGMA user_version = 0")  # Rebuild the search index
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('library_inode', ?)", (inode,))
+
+    def _add_last_access(self):
+        """parts.last_access (conversion or download time) orders expiry and quota eviction."""
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(parts)")}
+        with self.db:
+            if "last_access" not in columns:
+                self.db.execute("ALTER TABLE parts ADD COLUMN last_access REAL")
+                self.db.execute("UPDATE parts SET last_access = converted_at")
+            self.db.execute("CREATE INDEX IF NOT EXISTS parts_last_access ON parts(last_access)")
+
+    def _add_models_pending(self):
+        """parts.models_pending marks parts whose 3D models are still to be fetched (see ModelStage)."""
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(parts)")}
+        if "models_pending" not in columns:
+            with self.db:
+                self.db.execute("ALTER TABLE parts ADD COLUMN models_pending INTEGER NOT NULL DEFAULT 0")
+
+    def _migrate_legacy_log(self):
+        log_path = os.path.join(self.library_dir, LEGACY_PROCESSED_LOG_NAME)
+        if not os.path.isfile(log_path):
+            return
+        logged_at = os.path.getmtime(log_path)
+        with open(log_path, 'r') as f_log:
+            legacy_ids = {normalize_lcsc_id(line) for line in f_log} - {None}
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO parts (lcsc_id, converted_at, last_access) VALUES (?, ?, ?)",
+                                [(lcsc_id, logged_at, logged_at) for lcsc_id in legacy_ids])
+        with preserved_mtime(self.library_dir):
+            os.replace(log_path, log_path + ".migrated")
+        logger.info(f"Migrated {len(legacy_ids)} processed IDs from {log_path} into {self.path}")
+
+    def _normalize_part_ids(self):
+        """Rewrite part IDs stored before they were normalized ('c01525' from an old processed-IDs log).
+
+        Such IDs never match a requested part, so the part may since have been converted again under
+        its canonical ID; then the stale row is dropped, as are IDs that are no part number at all.
+        """
+        if self.db.execute("SELECT 1 FROM meta WHERE key = 'ids_normalized'").fetchone():
+            return
+        renamed = dropped = 0
+        with self.db:
+            for lcsc_id in sorted(self.ids):
+                if lcsc_id.startswith(UNTRACKED_PREFIX):
+                    continue
+                canonical = normalize_lcsc_id(lcsc_id)
+                if canonical == lcsc_id:
+                    continue
+                if canonical and canonical not in self.ids:
+                    self.db.execute("INSERT INTO parts (lcsc_id, converted_at, duration, job_id, last_access, "
+                                    "models_pending) SELECT ?, converted_at, duration, job_id, last_access, "
+                                    "models_pending FROM parts WHERE lcsc_id = ?", (canonical, lcsc_id))
+                    self.db.execute("UPDATE artifacts SET lcsc_id = ? WHERE lcsc_id = ?", (canonical, lcsc_id))
+                    self.db.execute("UPDATE search_fields SET lcsc_id = ? WHERE lcsc_id = ?", (canonical, lcsc_id))
+                    self.ids.add(canonical)
+                    renamed += 1
+                else:
+                    self.db.execute("DELETE FROM search_fields WHERE lcsc_id = ?", (lcsc_id,))
+                    dropped += 1
+                self.db.execute("DELETE FROM parts WHERE lcsc_id = ?", (lcsc_id,))
+                self.ids.discard(lcsc_id)
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('ids_normalized', 1)")
+        if renamed or dropped:
+            logger.info(f"Normalized {renamed} and dropped {dropped} part IDs in {self.path}")
+
+    def _import_untracked_files(self):
+        """Once per catalog, add the library files no part accounts for (converted before the catalog
+        existed, or added by hand) as one untracked entry per file, aged by the file's mtime, so
+        expiry and the disk quota cover them. The merged symbol library and hidden files are skipped."""
+        if self.db.execute("SELECT 1 FROM meta WHERE key = 'untracked_imported'").fetchone():
+            return
+        tracked = {row[0] for row in self.db.execute("SELECT path FROM artifacts")}
+        symbols_dir = os.path.join(self.library_dir, "symbols")
+        shard_pattern = get_symbol_library(self.library_dir).shard_pattern
+        parts, artifacts = [], []
+        for root, dirs, files in os.walk(self.library_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                rel_path = os.path.relpath(path, self.library_dir)
+                if (name.startswith(".") or rel_path in tracked
+                        or (root == symbols_dir and shard_pattern.match(name))):
+                    continue
+                try:
+                    stats = os.stat(path)
+                    sha256 = None
+                    if stats.st_nlink > 1:  # Linked from the blob store, which is collected with it
+                        sha = hashlib.sha256()
+                        with open(path, 'rb') as f:
+                            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                                sha.update(chunk)
+                        sha256 = sha.hexdigest()
+                except OSError as e:
+                    logger.warning(f"Could not inspect {path}: {e}")
+                    continue
+                lcsc_id = UNTRACKED_PREFIX + rel_path
+                parts.append((lcsc_id, stats.st_mtime, stats.st_mtime))
+                artifacts.append((lcsc_id, "file", name, rel_path, stats.st_size, sha256))
+        with self.lock, self.db:
+            self.db.executemany("INSERT OR IGNORE INTO parts (lcsc_id, converted_at, last_access) VALUES (?, ?, ?)",
+                                parts)
+            self.db.executemany("INSERT OR IGNORE INTO artifacts (lcsc_id, kind, name, path, size, sha256) "
+                                "VALUES (?, ?, ?, ?, ?, ?)", artifacts)
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('untracked_imported', ?)", (time.time(),))
+            self.ids.update(lcsc_id for lcsc_id, _, _ in parts)
+        if parts:
+            logger.info(f"Cataloged {len(parts)} untracked files of library '{os.path.basename(self.library_dir)}' "
+                        f"for expiry")
+
+    def _create_search_index(self):
+        """Create the search tables, and index the parts converted before they existed.
+
+        search_index is kept in sync with search_fields by triggers. Without the FTS5 trigram
+        tokenizer (SQLite < 3.34) searches scan search_fields instead.
+        """
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS search_fields (
+                id INTEGER PRIMARY KEY,
+                lcsc_id TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS search_fields_part ON search_fields(lcsc_id);
+        """)
+        try:
+            self.db.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+                    value, content='search_fields', content_rowid='id', tokenize='trigram');
+                CREATE TRIGGER IF NOT EXISTS search_fields_insert AFTER INSERT ON search_fields BEGIN
+                    INSERT INTO search_index (rowid, value) VALUES (new.id, new.value);
+                END;
+                CREATE TRIGGER IF NOT EXISTS search_fields_delete AFTER DELETE ON search_fields BEGIN
+                    INSERT INTO search_index (search_index, rowid, value) VALUES ('delete', old.id, old.value);
+                END;
+            """)
+            self.search_sql = ("SELECT f.lcsc_id, f.field, f.value FROM search_index "
+                               "JOIN search_fields f ON f.id = search_index.rowid "
+                               "WHERE search_index.value LIKE ? LIMIT ?")
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite lacks FTS5 trigram support ({e}), library search will scan the catalog.")
+            self.search_sql = "SELECT lcsc_id, field, value FROM search_fields WHERE value LIKE ? LIMIT ?"
+        if self.db.execute("PRAGMA user_version").fetchone()[0] >= SEARCH_INDEX_VERSION:
+            return
+        artifacts = defaultdict(list)
+        if self.ids:
+            symbol_library = get_symbol_library(self.library_dir)
+            for lcsc_id, kind, name in self.db.execute("SELECT lcsc_id, kind, name FROM artifacts"):
+                artifact = {"kind": kind, "name": name}
+                if kind == "symbol":
+                    artifact["properties"] = symbol_properties(symbol_library.read_symbol(name) or b"")
+                artifacts[lcsc_id].append(artifact)
+        with self.db:
+            self.db.execute("DELETE FROM search_fields")
+            self.db.executemany("INSERT INTO search_fields (lcsc_id, field, value) VALUES (?, ?, ?)",
+                                [(lcsc_id, field, value) for lcsc_id in self.ids
+                                 if not lcsc_id.startswith(UNTRACKED_PREFIX)
+                                 for field, value in search_terms(lcsc_id, artifacts[lcsc_id])])
+            self.db.execute(f"PRAGMA user_version = {SEARCH_INDEX_VERSION}")
+        if self.ids:
+            logger.info(f"Indexed {len(self.ids)} parts of library '{os.path.basename(self.library_dir)}' for search")
+
+    def __contains__(self, lcsc_id):
+        return lcsc_id in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def record_part(self, lcsc_id, artifacts, duration=None, job_id=None, models_pending=False):
+        """Store (or replace) a converted part and its artifacts: dicts with kind, name, path, size, sha256."""
+        now = time.time()
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO parts (lcsc_id, converted_at, duration, job_id, last_access, "
+                            "models_pending) VALUES (?, ?, ?, ?, ?, ?)",
+                            (lcsc_id, now, duration, job_id, now, int(models_pending)))
+            self.db.execute("DELETE FROM artifacts WHERE lcsc_id = ?", (lcsc_id,))
+            self.db.executemany("INSERT OR REPLACE INTO artifacts (lcsc_id, kind, name, path, size, sha256) "
+                                "VALUES (?, ?, ?, ?, ?, ?)",
+                                [(lcsc_id, a["kind"], a["name"], os.path.relpath(a["path"], self.library_dir),
+                                  a["size"], a["sha256"]) for a in artifacts])
+            self.db.execute("DELETE FROM search_fields WHERE lcsc_id = ?", (lcsc_id,))
+            self.db.executemany("INSERT INTO search_fields (lcsc_id, field, value) VALUES (?, ?, ?)",
+                                [(lcsc_id, field, value) for field, value in search_terms(lcsc_id, artifacts)])
+            self.ids.add(lcsc_id)
+
+    def add_models(self, lcsc_id, artifacts):
+        """Add the 3D models fetched for a part and clear its models_pending mark. Returns False if
+        the part is no longer in the catalog."""
+        with self.lock, self.db:
+            if lcsc_id not in self.ids:
+                return False
+            self.db.executemany("INSERT OR REPLACE INTO artifacts (lcsc_id, kind, name, path, size, sha256) "
+                                "VALUES (?, ?, ?, ?, ?, ?)",
+                                [(lcsc_id, a["kind"], a["name"], os.path.relpath(a["path"], self.library_dir),
+                                  a["size"], a["sha256"]) for a in artifacts])
+            self.db.execute("DELETE FROM search_fields WHERE lcsc_id = ? AND field = '3d_model'", (lcsc_id,))
+            self.db.executemany("INSERT INTO search_fields (lcsc_id, field, value) VALUES (?, ?, ?)",
+                                [(lcsc_id, field, value) for field, value in search_terms(lcsc_id, artifacts)
+                                 if field == "3d_model"])
+            self.db.execute("UPDATE parts SET models_pending = 0 WHERE lcsc_id = ?", (lcsc_id,))
+        return True
+
+    def pending_models(self):
+        """LCSC IDs of the parts whose 3D models are still to be fetched."""
+        with self.lock:
+            return [row[0] for row in self.db.execute("SELECT lcsc_id FROM parts WHERE models_pending")]
+
+    def get_part(self, lcsc_id):
+        with self.lock:
+            row = self.db.execute("SELECT lcsc_id, converted_at, duration, job_id, models_pending FROM parts "
+                                  "WHERE lcsc_id = ?", (lcsc_id,)).fetchone()
+            if not row:
+                return None
+            artifacts = self.db.execute("SELECT kind, name, path, size, sha256 FROM artifacts WHERE lcsc_id = ?",
+                                        (lcsc_id,)).fetchall()
+        return {"lcsc_id": row[0], "converted_at": row[1], "duration": row[2], "job_id": row[3],
+                "models_pending": bool(row[4]),
+                "artifacts": [{"kind": kind, "name": name, "path": path, "size": size, "sha256": sha256}
+                              for kind, name, path, size, sha256 in artifacts]}
+
+    def touch(self, lcsc_id):
+        with self.lock, self.db:
+            self.db.execute("UPDATE parts SET last_access = ? WHERE lcsc_id = ?", (time.time(), lcsc_id))
+
+    def touch_path(self, path):
+        """Mark the parts owning a downloaded footprint/3D model (path relative to the library) as used.
+
+        Symbol shards are shared by hundreds of parts, so downloading one does not count.
+        """
+        with self.lock, self.db:
+            self.db.execute("UPDATE parts SET last_access = ? WHERE lcsc_id IN "
+                            "(SELECT lcsc_id FROM artifacts WHERE path = ? AND kind != 'symbol')",
+                            (time.time(), path))
+
+    def due_parts(self, cutoff, limit):
+        """LCSC IDs of up to limit parts last used before cutoff, least recently used first."""
+        with self.lock:
+            return [row[0] for row in self.db.execute(
+                "SELECT lcsc_id FROM parts WHERE last_access < ? ORDER BY last_access LIMIT ?", (cutoff, limit))]
+
+    def iter_by_last_access(self, batch_size=100):
+        """Yield (last_access, lcsc_id) for all parts, least recently used first."""
+        position = (float("-inf"), "")
+        while True:
+            with self.lock:
+                rows = self.db.execute("SELECT last_access, lcsc_id FROM parts WHERE (last_access, lcsc_id) > (?, ?) "
+                                       "ORDER BY last_access, lcsc_id LIMIT ?", (*position, batch_size)).fetchall()
+            if not rows:
+                return
+            yield from rows
+            position = rows[-1]
+
+    def remove_part(self, lcsc_id):
+        """Delete a part and its artifact rows. Returns the part as get_part did, or None."""
+        part = self.get_part(lcsc_id)
+        if part:
+            with self.lock, self.db:
+                self.db.execute("DELETE FROM artifacts WHERE lcsc_id = ?", (lcsc_id,))
+                self.db.execute("DELETE FROM search_fields WHERE lcsc_id = ?", (lcsc_id,))
+                self.db.execute("DELETE FROM parts WHERE lcsc_id = ?", (lcsc_id,))
+                self.ids.discard(lcsc_id)
+        return part
+
+    def search(self, query, prefix=False, limit=1000):
+        """(lcsc_id, field, value) of up to limit indexed values that start with (prefix) or contain
+        the query, ignoring case."""
+        pattern = f"{query}%" if prefix else f"%{query}%"
+        with self.lock:
+            rows = self.db.execute(self.search_sql, (pattern, limit)).fetchall()
+        needle = query.lower()  # LIKE also treats _ and % in the query as wildcards
+        return [row for row in rows if (row[2].lower().startswith(needle) if prefix else needle in row[2].lower())]
+
+    def search_fields(self, lcsc_ids):
+        """lcsc_id -> {field: [values]} of the given parts."""
+        fields = {lcsc_id: defaultdict(list) for lcsc_id in lcsc_ids}
+        with self.lock:
+            rows = self.db.execute(f"SELECT lcsc_id, field, value FROM search_fields WHERE lcsc_id IN "
+                                   f"({','.join('?' * len(lcsc_ids))}) ORDER BY id", list(lcsc_ids)).fetchall()
+        for lcsc_id, field, value in rows:
+            fields[lcsc_id][field].append(value)
+        return fields
+
+    def is_referenced(self, kind, name, path):
+        """Whether any part still uses this symbol (by name) or file (by path)."""
+        with self.lock:
+            if kind == "symbol":
+                row = self.db.execute("SELECT 1 FROM artifacts WHERE kind = 'symbol' AND name = ? LIMIT 1",
+                                      (name,)).fetchone()
+            else:
+                row = self.db.execute("SELECT 1 FROM artifacts WHERE path = ? LIMIT 1", (path,)).fetchone()
+        return row is not None
+
+
+catalogs = {}
+catalogs_lock = threading.Lock()
+
+
+def get_catalog(library_dir):
+    with catalogs_lock:
+        if library_dir not in catalogs:
+            catalogs[library_dir] = PartCatalog(library_dir)
+        return catalogs[library_dir]
+
+
+def has_catalog(library_dir):
+    """Whether parts were ever cataloged for library_dir (also by versions without a catalog);
+    get_catalog would create an empty catalog."""
+    return (library_dir in catalogs or os.path.exists(catalog_path(library_dir))
+            or any(os.path.exists(os.path.join(library_dir, name))
+                   for name in (CATALOG_NAME, LEGACY_PROCESSED_LOG_NAME)))
+
+
+STAGING_MANIFEST_NAME = "manifest.ndjson"
+
+
+class StagingCommit:
+    """Tracks the library files replaced while committing one part, so they can be rolled back.
+
+    Before a destination is replaced it is hard-linked (copied only where links fail) into a
+    backup folder next to the staging prefix; rollback() restores those backups and removes
+    destinations that did not exist before. Every change is also appended (fsync'd) to a
+    manifest in the backup folder, so a commit cut off by a crash is rolled back by recover().
+    """
+
+    def __init__(self, temp_output_prefix):
+        self.backup_dir = temp_output_prefix + ".backup"
+        self.changes = []
+
+    def protect(self, dest_path):
+        backup_path = None
+        os.makedirs(self.backup_dir, exist_ok=True)
+        if os.path.exists(dest_path):
+            backup_path = os.path.join(self.backup_dir, f"{len(self.changes)}_{os.path.basename(dest_path)}")
+            try:
+                os.link(dest_path, backup_path)
+            except OSError:
+                shutil.copy2(dest_path, backup_path)
+        self.changes.append((dest_path, backup_path))
+        with open(os.path.join(self.backup_dir, STAGING_MANIFEST_NAME), 'a') as manifest:
+            manifest.write(json.dumps([dest_path, backup_path]) + "\n")
+            manifest.flush()
+            os.fsync(manifest.fileno())
+
+    @classmethod
+    def recover(cls, temp_output_prefix):
+        """Roll back the commit a crashed conversion left behind in temp_output_prefix.backup."""
+        commit = cls(temp_output_prefix)
+        try:
+            with open(os.path.join(commit.backup_dir, STAGING_MANIFEST_NAME), 'r') as manifest:
+                for line in manifest:
+                    try:
+                        commit.changes.append(tuple(json.loads(line)))
+                    except ValueError:
+                        break  # Torn last line: that destination was not touched yet
+        except FileNotFoundError:
+            pass
+        if commit.changes:
+            logger.warning(f"Rolling back the interrupted commit of {os.path.basename(temp_output_prefix)}")
+            commit.rollback()
+        commit.finish()
+
+    def rollback(self):
+        for dest_path, backup_path in reversed(self.changes):
+            try:
+                if backup_path:
+                    os.replace(backup_path, dest_path)
+                    logger.info(f"    Restored {os.path.relpath(dest_path, OUTPUT_BASE)}")
+                elif os.path.exists(dest_path):
+                    os.remove(dest_path)
+                    logger.info(f"    Removed {os.path.relpath(dest_path, OUTPUT_BASE)}")
+            except Exception as e:
+                logger.error(f"    !!! FAILED to roll back {dest_path}: {e}", exc_info=True)
+        self.changes = []
+
+    def finish(self):
+        shutil.rmtree(self.backup_dir, ignore_errors=True)
+
+
+library_commit_locks = defaultdict(threading.Lock)
+
+
+def commit_artifact(commit, source_path, dest_path, kind, artifacts, normalize=None):
+    """Commit one staged footprint/3D model file. Returns 1 if the library changed, 0 if it was identical."""
+    existed = os.path.exists(dest_path)
+    name = os.path.basename(dest_path)
+    artifact_kind = "footprint" if kind == "Footprint" else "3d_model"
+    with job_tracer.span(f"commit_{artifact_kind}", file=name):
+        commit.protect(dest_path)
+        outcome, blob = blob_store.commit(source_path, dest_path, normalize=normalize)
+    artifact = {"kind": artifact_kind, "name": name, "path": dest_path,
+                "size": os.path.getsize(blob), "sha256": os.path.splitext(os.path.basename(blob))[0]}
+    artifacts.append(artifact)
+    ARTIFACT_BYTES.observe(artifact["size"], kind=artifact["kind"], outcome=outcome)
+    if outcome == "identical":
+        logger.info(f"    {kind} {name} is unchanged, skipped copy")
+        return 0
+    if existed:
+        logger.warning(f"    Replaced existing {kind}: {os.path.relpath(dest_path, OUTPUT_BASE)}")
+    logger.info(f"    Successfully {outcome} {kind}: {name} to {os.path.relpath(dest_path, OUTPUT_BASE)}")
+    return 1
+
+
+ARTIFACT_KINDS = ("symbol", "footprint", "3d_model")
+
+
+def organize_files(temp_output_prefix, library_dir, artifacts=None, expected=ARTIFACT_KINDS):
+    """Commit the staged output of one conversion into library_dir, all or nothing.
+
+    Footprints and 3D models are moved into the blob store and linked into the library, the
+    symbol is merged last. If any step fails, every library file touched for this part is
+    rolled back. Returns True when the part was committed without errors; the committed files
+    are appended to artifacts (see PartCatalog.record_part) when a list is given. Missing
+    output is only logged for the expected artifact kinds.
+    """
+    if artifacts is None:
+        artifacts = []
+    started = time.monotonic()
+    logger.info(f"--- Starting file organization ---")
     logger.info(f"Using prefix: {temp_output_prefix}")
     logger.info(f"Target library dir: {library_dir}")
     copied_count = 0
@@ -365,73 +1755,70 @@ def organize_files(temp_output_prefix, library_dir):
         os.makedirs(dest_fp_dir, exist_ok=True)
         os.makedirs(dest_3d_dir, exist_ok=True)
         logger.debug(f"Ensured destination subdirs exist: {dest_sym_dir}, {dest_fp_dir}, {dest_3d_dir}")
-        if os.path.isfile(source_sym_path):
-            items_to_cleanup.append(source_sym_path)
-            logger.debug(f"Found symbol file: {source_sym_path}")
-            try:
-                base_name = os.path.basename(source_sym_path)
-                sanitized_name = re.sub(r'[<>:"/\\|?* ]', '_', base_name)
-                dest_path = os.path.join(dest_sym_dir, sanitized_name)
-                if os.path.exists(dest_path):
-                    logger.warning(f"    Overwriting existing symbol: {os.path.relpath(dest_path, OUTPUT_BASE)}")
-                shutil.copy2(source_sym_path, dest_path)
-                logger.info(
-                    f"    Successfully copied Symbol: {sanitized_name} to {os.path.relpath(dest_path, OUTPUT_BASE)}");
-                copied_count += 1
-            except Exception as e:
-                logger.error(f"    !!! FAILED to copy symbol {source_sym_path} to {dest_path}: {e}", exc_info=True);
-                errors_encountered = True
-        else:
-            logger.warning(f"Symbol file not found: {source_sym_path}")
-        if os.path.isdir(source_fp_dir):
-            items_to_cleanup.append(source_fp_dir)
-            logger.debug(f"Found footprint directory: {source_fp_dir}")
+        for source_path in (source_sym_path, source_fp_dir, source_3d_dir, temp_output_prefix):
+            if os.path.exists(source_path):
+                items_to_cleanup.append(source_path)
+
+        # Footprints point their 3D models at the staging prefix; point them at the library
+        # instead, which also makes identical footprints hash identically
+        staged_model_dir = (temp_output_prefix + ".3dshapes").encode('utf-8')
+        library_model_dir = dest_3d_dir.encode('utf-8')
+
+        def normalize_footprint(data):
+            return data.replace(b"\r\n", b"\n").replace(staged_model_dir, library_model_dir)
+
+        commit = StagingCommit(temp_output_prefix)
+        lock_requested = time.monotonic()
+        with library_commit_locks[library_dir]:
+            job_tracer.finish("library_lock_wait", time.monotonic() - lock_requested)
             try:
-                for filename in os.listdir(source_fp_dir):
-                    if filename.endswith(".kicad_mod"):
+                if os.path.isdir(source_fp_dir):
+                    logger.debug(f"Found footprint directory: {source_fp_dir}")
+                    for filename in os.listdir(source_fp_dir):
                         src_fp_file = os.path.join(source_fp_dir, filename)
-                        sanitized_name = re.sub(r'[<>:"/\\|?* ]', '_', filename)
-                        dest_fp_file = os.path.join(dest_fp_dir, sanitized_name)
-                        if os.path.isfile(src_fp_file):
-                            if os.path.exists(dest_fp_file):
-                                logger.warning(
-                                    f"    Overwriting existing footprint: {os.path.relpath(dest_fp_file, OUTPUT_BASE)}")
-                            shutil.copy2(src_fp_file, dest_fp_file)
-                            logger.info(
-                                f"    Successfully copied Footprint: {sanitized_name} to {os.path.relpath(dest_fp_file, OUTPUT_BASE)}");
-                            copied_count += 1
+                        if filename.endswith(".kicad_mod") and os.path.isfile(src_fp_file):
+                            sanitized_name = re.sub(r'[<>:"/\\|?* ]', '_', filename)
+                            copied_count += commit_artifact(commit, src_fp_file,
+                                                            os.path.join(dest_fp_dir, sanitized_name),
+                                                            "Footprint", artifacts, normalize=normalize_footprint)
+                elif "footprint" in expected:
+                    logger.warning(f"Footprint directory not found: {source_fp_dir}")
+                if os.path.isdir(source_3d_dir):
+                    logger.debug(f"Found 3D model directory: {source_3d_dir}")
+                    for filename in os.listdir(source_3d_dir):
+                        src_3d_file = os.path.join(source_3d_dir, filename)
+                        if filename.endswith((".step", ".wrl")) and os.path.isfile(src_3d_file):
+                            copied_count += commit_artifact(commit, src_3d_file, os.path.join(dest_3d_dir, filename),
+                                                            "3D Model", artifacts)
+                elif "3d_model" in expected:
+                    logger.warning(f"3D model directory not found: {source_3d_dir}")
+                # The symbol goes last: its shard swap is atomic, so once it succeeds the part is committed
+                if os.path.isfile(source_sym_path):
+                    logger.debug(f"Found symbol file: {source_sym_path}")
+                    symbol_library = get_symbol_library(library_dir)
+                    with job_tracer.span("merge_symbol"):
+                        merged = symbol_library.add_file(source_sym_path)
+                    merged_names = [symbol["name"] for symbol in merged]
+                    artifacts.extend(dict(symbol, kind="symbol") for symbol in merged)
+                    for symbol in merged:
+                        ARTIFACT_BYTES.observe(symbol["size"], kind="symbol", outcome="merged")
+                    if merged_names:
+                        logger.info(f"    Successfully merged Symbol(s) {', '.join(merged_names)} into "
+                                    f"{os.path.relpath(symbol_library.symbols_dir, OUTPUT_BASE)}")
+                        copied_count += 1
+                    else:
+                        logger.warning(f"    No symbols found in {source_sym_path}")
+                elif "symbol" in expected:
+                    logger.warning(f"Symbol file not found: {source_sym_path}")
             except Exception as e:
-                logger.error(f"    !!! FAILED processing footprint dir {source_fp_dir}: {e}", exc_info=True);
+                logger.error(f"    !!! FAILED to commit files for {os.path.basename(temp_output_prefix)}: {e}. "
+                             f"Rolling back.", exc_info=True)
                 errors_encountered = True
-        else:
-            logger.warning(f"Footprint directory not found: {source_fp_dir}")
-        if os.path.isdir(source_3d_dir):
-            items_to_cleanup.append(source_3d_dir)
-            logger.debug(f"Found 3D model directory: {source_3d_dir}")
-            try:
-                for filename in os.listdir(source_3d_dir):
-                    if filename.endswith((".step", ".wrl")):
-                        src_3d_file = os.path.join(source_3d_dir, filename)
-                        dest_3d_file = os.path.join(dest_3d_dir, filename)
-                        if os.path.isfile(src_3d_file):
-                            if os.path.exists(dest_3d_file):
-                                logger.warning(
-                                    f"    Overwriting existing 3D model: {os.path.relpath(dest_3d_file, OUTPUT_BASE)}")
-                            shutil.copy2(src_3d_file, dest_3d_file)
-                            logger.info(
-                                f"    Successfully copied 3D Model: {filename} to {os.path.relpath(dest_3d_file, OUTPUT_BASE)}");
-                            copied_count += 1
-            except Exception as e:
-                logger.error(f"    !!! FAILED processing 3D model dir {source_3d_dir}: {e}", exc_info=True);
-                errors_encountered = True
-        else:
-            logger.warning(f"3D model directory not found: {source_3d_dir}")
-        original_empty_dir = temp_output_prefix
-        if os.path.isdir(original_empty_dir):
-            items_to_cleanup.append(original_empty_dir);
-            logger.debug(f"Adding original empty dir to cleanup list: {original_empty_dir}")
-        elif os.path.exists(original_empty_dir):
-            logger.warning(f"Original temp path exists but is not a directory? {original_empty_dir}")
+                commit.rollback()
+                copied_count = 0
+                del artifacts[:]
+            finally:
+                commit.finish()
     except Exception as e:
         logger.error(f"--- ERROR during file organization setup for {temp_output_prefix} -> {library_dir}: {str(e)} ---",
                      exc_info=True);
@@ -446,68 +1833,186 @@ def organize_files(temp_output_prefix, library_dir):
                 elif os.path.isdir(item_path):
                     shutil.rmtree(item_path, ignore_errors=True);
                     logger.debug(f"    Removed temp directory: {item_path}")
-                else:
-                    logger.warning(f"    Item to cleanup not found or not file/dir: {item_path}")
             except Exception as cleanup_err:
                 logger.error(f"    !!! FAILED to cleanup temporary item {item_path}: {cleanup_err}", exc_info=True);
-                errors_encountered = True
         if copied_count == 0 and not errors_encountered:
-            logger.warning(
-                f"--- Organization finished: No files were copied for prefix {os.path.basename(temp_output_prefix)} (sources might be missing or empty).")
+            # Models fetched later (expected=()) are often shared with parts already in the library
+            (logger.warning if expected else logger.info)(
+                f"--- Organization finished: No files were changed for prefix {os.path.basename(temp_output_prefix)} (sources might be missing, empty or identical).")
         elif errors_encountered:
             logger.error(
-                f"--- Organization finished: Errors WERE encountered during processing for {os.path.basename(temp_output_prefix)}. Copied {copied_count} files.")
+                f"--- Organization finished: Errors WERE encountered for {os.path.basename(temp_output_prefix)}, nothing was committed.")
         else:
             logger.info(
-                f"--- Organization finished successfully for {os.path.basename(temp_output_prefix)}. Copied {copied_count} files.")
-    # Return True if organization happened without critical errors during copy/processing, False otherwise
-    # We consider missing source files as non-critical error for this return value, but cleanup errors are critical.
+                f"--- Organization finished successfully for {os.path.basename(temp_output_prefix)}. Committed {copied_count} files.")
+        STAGE_SECONDS.observe(time.monotonic() - started, stage="organize_files")
+        job_tracer.finish("organize_files", time.monotonic() - started)
     return not errors_encountered
 
 
+# Expiry works from the catalogs instead of walking the library tree: every cycle asks each
+# catalog (indexed on last_access) for the parts that are due, and removes each part as a
+# unit. Files from before the catalog are imported once as untracked entries (see
+# PartCatalog._import_untracked_files), so they expire the same way.
+CLEANUP_INTERVAL = 600  # seconds
+STALE_TEMP_AGE = 3600  # seconds before a leftover staging dir in OUTPUT_BASE/temp is removed
+EXPIRY_BATCH = 200
+
+
+def remove_part_unit(library_dir, lcsc_id):
+    """Remove a part from a library: its symbol, the footprints and 3D models no other part uses,
+    and its catalog entry. Returns an estimate of the bytes freed on disk."""
+    catalog = get_catalog(library_dir)
+    freed = 0
+    blob_paths = []
+    with library_commit_locks[library_dir]:
+        part = catalog.remove_part(lcsc_id)
+        if not part:
+            return 0
+        shared = [a for a in part["artifacts"] if catalog.is_referenced(a["kind"], a["name"], a["path"])]
+        symbols = [a for a in part["artifacts"] if a["kind"] == "symbol" and a not in shared]
+        if symbols:
+            removed = get_symbol_library(library_dir).remove([a["name"] for a in symbols])
+            freed += sum(a["size"] or 0 for a in symbols if a["name"] in removed)
+        for artifact in part["artifacts"]:
+            if artifact["kind"] == "symbol" or artifact in shared:
+                continue
+            path = os.path.join(library_dir, artifact["path"])
+            try:
+                stats = os.stat(path)
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            if stats.st_nlink <= 2:  # This was the last library link to the blob
+                freed += stats.st_size
+            if artifact["sha256"]:
+                blob_paths.append(blob_store.blob_path(artifact["sha256"], os.path.splitext(path)[1]))
+    blob_store.collect_garbage(blob_paths)
+    logger.info(f"Cleanup: removed part {lcsc_id} from library '{os.path.basename(library_dir)}'")
+    return freed
+
+
+def expire_old_parts(library_dirs):
+    cutoff = time.time() - CLEANUP_DAYS * 86400
+    expired = 0
+    for library_dir in filter(has_catalog, library_dirs):
+        catalog = get_catalog(library_dir)
+        while True:
+            due = catalog.due_parts(cutoff, EXPIRY_BATCH)
+            if not due:
+                break
+            for lcsc_id in due:
+                remove_part_unit(library_dir, lcsc_id)
+                expired += 1
+    return expired
+
+
+def library_disk_usage(library_dirs):
+    """Bytes used by converted parts: stored blobs plus the merged symbol libraries."""
+    return blob_store.get_stats()["stored_bytes"] + sum(get_symbol_library(library_dir).total_size()
+                                                        for library_dir in library_dirs)
+
+
+def enforce_disk_quota(library_dirs):
+    """Evict the least recently downloaded parts, across all libraries, until usage fits DISK_QUOTA_MB."""
+    quota = DISK_QUOTA_MB * 1024 * 1024
+    usage = library_disk_usage(library_dirs)
+    if usage <= quota:
+        return 0
+    logger.info(f"Cleanup: library data uses {usage // (1024 * 1024)} MB, quota is {DISK_QUOTA_MB} MB")
+    by_last_access = heapq.merge(*(((last_access, lcsc_id, library_dir)
+                                    for last_access, lcsc_id in get_catalog(library_dir).iter_by_last_access())
+                                   for library_dir in filter(has_catalog, library_dirs)))
+    evicted = 0
+    for last_access, lcsc_id, library_dir in by_last_access:
+        if usage <= quota:
+            break
+        usage -= remove_part_unit(library_dir, lcsc_id)
+        evicted += 1
+    return evicted
+
+
+def staging_entries():
+    """Staging output (temp_<id>_<ts> prefixes and their backups) in OUTPUT_BASE/temp and the worker folders."""
+    temp_root = os.path.join(OUTPUT_BASE, "temp")
+    if not os.path.isdir(temp_root):
+        return []
+    entries = []
+    for entry in os.scandir(temp_root):
+        if entry.name.startswith("temp_"):
+            entries.append(entry)
+        elif entry.is_dir(follow_symlinks=False):  # Per-worker staging folder
+            entries.extend(child for child in os.scandir(entry.path) if child.name.startswith("temp_"))
+    return entries
+
+
+def recover_staging():
+    """At startup, before any conversion runs: roll back library commits cut off by a crash and
+    remove all staging output, which only interrupted conversions can have left behind."""
+    for entry in staging_entries():
+        if entry.name.endswith(".backup") and entry.is_dir(follow_symlinks=False):
+            try:
+                StagingCommit.recover(entry.path[:-len(".backup")])
+            except Exception as e:
+                logger.error(f"Could not roll back {entry.path}: {e}", exc_info=True)
+    removed = sweep_stale_temp_dirs(max_age=0)
+    if removed:
+        logger.info(f"Removed {removed} staging leftovers of interrupted conversions.")
+
+
+def sweep_stale_temp_dirs(max_age=STALE_TEMP_AGE):
+    """Remove staging output (temp_<id>_<ts> prefixes) left behind by crashed conversions."""
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in staging_entries():
+        try:
+            if entry.stat(follow_symlinks=False).st_mtime >= cutoff:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.remove(entry.path)
+            removed += 1
+            logger.info(f"Cleanup: removed stale staging output {os.path.relpath(entry.path, OUTPUT_BASE)}")
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            logger.error(f"Cleanup error removing {entry.path}: {e}")
+    return removed
+
+
 def cleanup_old_files():
+    # Blobs orphaned before this start are found by one full scan, later cycles only check
+    # the blobs of the parts they remove
+    removed_blobs = blob_store.collect_garbage()
+    if removed_blobs:
+        logger.info(f"Cleanup: removed {removed_blobs} unreferenced footprint/3D model blobs.")
     while True:
-        if DISABLE_CLEANUP:
-            logger.info("Cleanup is disabled. Sleeping indefinitely.")
-            time.sleep(3600 * 24 * 365)  # Sleep for a very long time
-            continue
+        started = time.monotonic()
         try:
-            cutoff = datetime.now() - timedelta(days=CLEANUP_DAYS)
             library_root_abs = os.path.abspath(os.path.join(OUTPUT_BASE, LIBRARY_ROOT_NAME))
-            if not os.path.exists(library_root_abs):
-                logger.info(f"Cleanup: Library root {library_root_abs} does not exist. Sleeping.")
-                time.sleep(3600 * 24)
-                continue
-            logger.info(f"Starting cleanup for files older than {cutoff} in {library_root_abs}")
-            cleaned_count = 0
-            for root, dirs, files in os.walk(library_root_abs):
-                for name in files:
-                    try:
-                        path = os.path.join(root, name)
-                        mtime = datetime.fromtimestamp(os.path.getmtime(path))
-                        if mtime < cutoff:
-                            os.remove(path)
-                            cleaned_count += 1
-                            logger.info(f"Cleaned up file: {os.path.relpath(path, OUTPUT_BASE)}")
-                    except FileNotFoundError:
-                        logger.warning(f"Cleanup: File not found during iteration: {path}")
-                    except Exception as e:
-                        logger.error(f"Cleanup error processing file {path}: {str(e)}")
-            logger.info(f"Cleanup finished. Removed {cleaned_count} old files.")
+            library_dirs = [folder['path'] for folder in list_library_folders(library_root_abs)]
+            if not DISABLE_CLEANUP:
+                expired = expire_old_parts(library_dirs)
+                if expired:
+                    logger.info(f"Cleanup: expired {expired} parts not used for {CLEANUP_DAYS} days.")
+            if DISK_QUOTA_MB > 0:
+                evicted = enforce_disk_quota(library_dirs)
+                if evicted:
+                    logger.info(f"Cleanup: evicted {evicted} least recently downloaded parts to fit the disk quota.")
+            sweep_stale_temp_dirs()
         except Exception as e:
             logger.error(f"General cleanup thread error: {str(e)}", exc_info=True)
-        time.sleep(3600)
-
-
-cleanup_thread = threading.Thread(target=cleanup_old_files, daemon=True)
-cleanup_thread.start()
+        STAGE_SECONDS.observe(time.monotonic() - started, stage="cleanup")
+        time.sleep(CLEANUP_INTERVAL)
 
 
-def get_latest_library_folder(library_root_abs):
+def list_library_folders(library_root_abs):
+    """Library folders under the library root, newest first."""
     if not os.path.exists(library_root_abs):
         os.makedirs(library_root_abs, exist_ok=True)
         logger.info(f"Created library root directory: {library_root_abs}")
-        return None
+        return []
     folders = []
     try:
         for item in os.listdir(library_root_abs):
@@ -521,30 +2026,187 @@ def get_latest_library_folder(library_root_abs):
                     continue
     except Exception as e:
         logger.error(f"Error listing directories in {library_root_abs}: {e}", exc_info=True)
-        return None
-    if not folders:
-        return None
+        raise
     folders.sort(key=lambda x: x['mtime'], reverse=True)
     logger.debug(f"Found libraries: {folders}")
-    return folders[0]['name']
+    return folders
 
 
-def render_directory_listing(directory_path_abs, base_path_abs):
-    output_lines = []
+LIBRARY_STATE_POLL_INTERVAL = 5  # seconds, when watchdog is not available
+
+
+class LibraryState:
+    """Add-on config, library folders and the current library, loaded once and kept current.
+
+    GET / reads this snapshot instead of re-reading the config and scanning the library root on
+    every request. Changes are picked up from watchdog (inotify) notifications on the library root
+    and the config folder, or by a polling thread when watchdog is missing or a folder cannot be watched.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.library_root = os.path.abspath(os.path.join(OUTPUT_BASE, LIBRARY_ROOT_NAME))
+        self.config_mtime = self._config_mtime()  # The config was loaded at import
+        self.libraries = []
+        self.current_library = DEFAULT_LIBRARY_NAME
+        self.error = None
+        self.observer = None
+        self.refresh_libraries()
+
+    @staticmethod
+    def _config_mtime():
+        try:
+            return os.stat(ADDON_CONFIG_PATH).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh_config(self):
+        mtime = self._config_mtime()
+        if mtime != self.config_mtime:
+            self.config_mtime = mtime
+            logger.info("Add-on configuration changed, reloading it.")
+            load_addon_config()
+            apply_conversion_settings()
+
+    def refresh_libraries(self):
+        try:
+            os.makedirs(self.library_root, exist_ok=True)
+            libraries = list_library_folders(self.library_root)
+            if not libraries:
+                # Create the default library first, so it is listed (and watched) from the start
+                os.makedirs(os.path.join(self.library_root, DEFAULT_LIBRARY_NAME), exist_ok=True)
+                libraries = list_library_folders(self.library_root)
+            current_library = libraries[0]['name'] if libraries else DEFAULT_LIBRARY_NAME
+            library_dir = os.path.join(self.library_root, current_library)
+            os.makedirs(library_dir, exist_ok=True)  # Ensure library directory exists
+            get_catalog(library_dir)
+        except Exception as e:
+            logger.error(f"Error loading the library folders in {self.library_root}: {e}", exc_info=True)
+            with self.lock:
+                self.error = str(e)
+            return
+        with self.lock:
+            if current_library != self.current_library:
+                logger.info(f"Current library is now '{current_library}'")
+            self.libraries = libraries
+            self.current_library = current_library
+            self.error = None
+
+    def snapshot(self):
+        with self.lock:
+            return {"library_root": self.library_root, "current_library": self.current_library,
+                    "library_dir": os.path.join(self.library_root, self.current_library),
+                    "libraries": list(self.libraries), "error": self.error}
+
+    def start(self):
+        config_dir = os.path.dirname(ADDON_CONFIG_PATH)
+        # watchdog's inotify thread blocks in a plain os.read, which would stall gevent's event loop
+        if Observer is not None and not GEVENT_PATCHED:
+            try:
+                handler = LibraryStateEventHandler(self)
+                self.observer = Observer()
+                self.observer.daemon = True
+                self.observer.schedule(handler, self.library_root, recursive=False)
+                if os.path.isdir(config_dir):
+                    self.observer.schedule(handler, config_dir, recursive=False)
+                self.observer.start()
+                logger.info("Watching the library root and add-on config for changes.")
+                if os.path.isdir(config_dir):
+                    return
+            except Exception as e:
+                logger.warning(f"Could not watch for library changes ({e}), polling instead.")
+                self.observer = None
+        threading.Thread(target=self.poll, daemon=True).start()
+
+    def poll(self):
+        while True:
+            time.sleep(LIBRARY_STATE_POLL_INTERVAL)
+            try:
+                self.refresh_config()
+                if self.observer is None:
+                    self.refresh_libraries()
+            except Exception as e:
+                logger.error(f"Error refreshing library state: {e}", exc_info=True)
+
+
+class LibraryStateEventHandler(FileSystemEventHandler):
+    """Routes watchdog events to the LibraryState refresh they affect."""
+
+    def __init__(self, state):
+        self.state = state
+
+    def on_any_event(self, event):
+        # Reading the watched folders produces open/close events, which must not trigger a refresh
+        if event.event_type not in ("created", "deleted", "moved", "modified"):
+            return
+        paths = {os.path.abspath(path) for path in (event.src_path, getattr(event, "dest_path", "")) if path}
+        try:
+            if ADDON_CONFIG_PATH in paths:
+                self.state.refresh_config()
+            if any(os.path.dirname(path) == self.state.library_root for path in paths):
+                self.state.refresh_libraries()
+        except Exception as e:
+            logger.error(f"Error refreshing library state: {e}", exc_info=True)
+
+
+# Directory listings are cached per directory and rebuilt only when the directory's mtime changes
+# (files are added, removed or replaced), so browsing a large footprints/ folder costs one stat call.
+LISTING_SORTS = {
+    "name": lambda item: (not item['is_dir'], item['name'].lower()),
+    "date": lambda item: (not item['is_dir'], -item['mtime']),
+    "size": lambda item: (not item['is_dir'], -item['size']),
+}
+LISTING_CACHE_SIZE = 64
+listing_cache = {}
+listing_cache_lock = threading.Lock()
+
+
+def scan_directory(directory_path_abs, sort):
+    """Sorted entries of a directory, served from the listing cache while the directory is unchanged."""
+    mtime_ns = os.stat(directory_path_abs).st_mtime_ns
+    with listing_cache_lock:
+        cached = listing_cache.get(directory_path_abs)
+        if cached and cached['mtime_ns'] == mtime_ns:
+            if sort not in cached['sorted']:
+                cached['sorted'][sort] = sorted(cached['items'], key=LISTING_SORTS[sort])
+            return cached['sorted'][sort]
     items = []
-    try:
-        for name in os.listdir(directory_path_abs):
-            full_path = os.path.join(directory_path_abs, name)
+    with os.scandir(directory_path_abs) as entries:
+        for entry in entries:
             try:
-                stats = os.stat(full_path)
-                is_dir = os.path.isdir(full_path)
-                items.append({'name': name, 'is_dir': is_dir, 'mtime': stats.st_mtime, 'size': stats.st_size,
-                              'full_path': full_path})
+                # DirEntry caches is_dir() from the directory read and stat() after the first call
+                is_dir = entry.is_dir()
+                stats = entry.stat()
+                items.append({'name': entry.name, 'is_dir': is_dir, 'mtime': stats.st_mtime, 'size': stats.st_size,
+                              'full_path': entry.path})
             except FileNotFoundError:
                 continue
             except OSError as e:
-                logger.error(f"OS error stating file {full_path}: {e}")
+                logger.error(f"OS error stating file {entry.path}: {e}")
                 continue
+    sorted_items = sorted(items, key=LISTING_SORTS[sort])
+    with listing_cache_lock:
+        listing_cache.pop(directory_path_abs, None)
+        listing_cache[directory_path_abs] = {'mtime_ns': mtime_ns, 'items': items, 'sorted': {sort: sorted_items}}
+        while len(listing_cache) > LISTING_CACHE_SIZE:
+            del listing_cache[next(iter(listing_cache))]
+    return sorted_items
+
+
+def render_directory_listing(directory_path_abs, base_path_abs, page=1, sort="name"):
+    output_lines = []
+    if sort not in LISTING_SORTS:
+        sort = "name"
+    current_rel_path = os.path.relpath(directory_path_abs, base_path_abs)
+
+    def listing_url(page, sort):
+        params = {'page': page, 'sort': sort}
+        if current_rel_path != ".":
+            params = {'path': current_rel_path, **params}
+        return "?" + urlencode(params)
+
+    try:
+        items = scan_directory(directory_path_abs, sort)
     except FileNotFoundError:
         return f"<pre>Error: Directory not found:\n{os.path.relpath(directory_path_abs, base_path_abs)}</pre>"
     except PermissionError:
@@ -552,7 +2214,11 @@ def render_directory_listing(directory_path_abs, base_path_abs):
     except Exception as e:
         logger.error(f"Error listing directory {directory_path_abs}: {e}", exc_info=True)
         return f"<pre>Error: Could not list directory:\n{os.path.relpath(directory_path_abs, base_path_abs)}</pre>"
-    items.sort(key=lambda x: (not x['is_dir'], x['name'].lower()))
+    page_count = max(1, -(-len(items) // PAGE_SIZE))
+    page = min(max(1, page), page_count)
+    sort_links = " | ".join(name if name == sort else f'<a href="{listing_url(1, name)}">{name}</a>'
+                            for name in LISTING_SORTS)
+    output_lines.append(f"Sort by: {sort_links}")
     if os.path.abspath(directory_path_abs) != os.path.abspath(base_path_abs):
         parent_dir_abs = os.path.dirname(directory_path_abs)
         if os.path.abspath(parent_dir_abs).startswith(os.path.abspath(base_path_abs)):
@@ -564,7 +2230,7 @@ def render_directory_listing(directory_path_abs, base_path_abs):
             output_lines.append(f"{time_str} {size_str} {link}")
         else:
             logger.warning(f"Attempted to link parent '..' outside base directory from {directory_path_abs}")
-    for item in items:
+    for item in items[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]:
         try:
             time_str = datetime.fromtimestamp(item['mtime']).strftime('%m/%d/%Y %I:%M %p')
             relative_path = os.path.relpath(item['full_path'], base_path_abs)
@@ -579,261 +2245,2232 @@ def render_directory_listing(directory_path_abs, base_path_abs):
         except Exception as e:
             logger.error(f"Error formatting item {item['name']}: {e}")
             output_lines.append(f"    Error processing item: {item['name']}")
-    is_empty = not items
-    has_only_dotdot = len(output_lines) == 1 and output_lines[0].endswith('..</a>')
-    if is_empty and not has_only_dotdot:
-        output_lines.append("    (Directory is empty)")
-    elif has_only_dotdot and is_empty:
+    if not items:
         output_lines.append("    (Directory is empty)")
+    elif page_count > 1:
+        previous_link = f'<a href="{listing_url(page - 1, sort)}">&laquo; Previous</a>' if page > 1 else "&laquo; Previous"
+        next_link = f'<a href="{listing_url(page + 1, sort)}">Next &raquo;</a>' if page < page_count else "Next &raquo;"
+        output_lines.append(f"\n{previous_link}   Page {page} of {page_count} ({len(items)} items)   {next_link}")
     return "<pre>" + "\n".join(output_lines) + "</pre>"
 
 
-@app.route('/logs')
-def stream_logs():
-    def generate():
+class TokenBucket:
+    """Thread-safe token bucket used to limit how fast conversions hit the EasyEDA/LCSC API."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def configure(self, rate, capacity):
+        with self.lock:
+            self.rate = rate
+            self.capacity = max(1.0, float(capacity))
+            self.tokens = min(self.tokens, self.capacity)
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
         while True:
-            try:
-                while not log_queue.empty():
-                    yield f"data: {log_queue.get()}\n\n"
-                time.sleep(0.2)
-            except GeneratorExit:
-                logger.info("Log stream client disconnected.")
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+upstream_rate_limiter = TokenBucket(UPSTREAM_RATE_LIMIT, MAX_PARALLEL_CONVERSIONS)
+
+
+# Transient failures (network errors, upstream 5xx/429, crashed converter workers) are retried
+# with exponential backoff and jitter, without holding a conversion slot while waiting. When
+# the API keeps failing, the circuit breaker pauses all conversions instead of letting every
+# queued part burn its retries.
+RETRY_BASE_DELAY = 5.0  # seconds before the first retry, doubled for every further attempt
+RETRY_MAX_DELAY = 120.0
+BREAKER_THRESHOLD = 5  # Transient upstream failures in a row that pause the conversions
+BREAKER_COOLDOWN = 30.0  # seconds before a paused queue probes upstream again
+BREAKER_MAX_COOLDOWN = 600.0
+
+
+def retry_delay(attempt):
+    """Backoff before retry number `attempt`: exponential and capped, with jitter so the retries of
+    a batch that failed together are spread out."""
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """Pauses all conversions after `threshold` transient upstream failures in a row.
+
+    While the breaker is open, conversions wait instead of spending worker time on an API that
+    is down. After the cooldown one conversion goes ahead as a probe (half-open): if upstream
+    answers it the breaker closes and the queue resumes, otherwise it opens again for twice as
+    long, up to max_cooldown.
+    """
+
+    def __init__(self, threshold, cooldown, max_cooldown):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.reopens_at = 0
+        self.probing = False
+        self.condition = threading.Condition()
+
+    def wait(self):
+        """Block until a conversion may start. Returns True when the caller is the half-open probe."""
+        with self.condition:
+            while True:
+                if self.state == "closed":
+                    return False
+                if self.state == "open" and time.monotonic() >= self.reopens_at:
+                    self.state = "half_open"
+                    logger.info("Upstream cooldown over, probing with a single conversion")
+                if self.state == "half_open" and not self.probing:
+                    self.probing = True
+                    return True
+                self.condition.wait(max(0, self.reopens_at - time.monotonic()) if self.state == "open" else None)
+
+    def record(self, failure, probe):
+        """Report how a conversion went: None on success, else its failure kind (see classify_failure)."""
+        with self.condition:
+            if probe:
+                self.probing = False
+            if failure == "worker":  # Tells nothing about upstream, let another conversion probe
+                self.condition.notify_all()
+                return
+            if failure != "transient":
+                if self.state != "closed":
+                    logger.info("Upstream is answering again, resuming conversions")
+                    log_broker.publish("Upstream is answering again, resuming conversions.")
+                self.state = "closed"
+                self.failures = 0
+                self.cooldown = self.base_cooldown
+                self.condition.notify_all()
                 return
+            self.failures += 1
+            if probe:
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            elif self.state != "closed" or self.failures < self.threshold:
+                return
+            self.state = "open"
+            self.reopens_at = time.monotonic() + self.cooldown
+            logger.warning(f"{self.failures} upstream failures in a row, pausing conversions for {self.cooldown:.0f}s")
+            log_broker.publish(f"[WARNING] EasyEDA/LCSC is not answering, conversions paused for {self.cooldown:.0f}s.")
+            self.condition.notify_all()
+
+
+class DelayedCalls:
+    """Runs functions after a delay from a single timer thread (instead of a threading.Timer per call)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = []  # heap of (due, sequence, function)
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def call_later(self, delay, function):
+        with self.condition:
+            heapq.heappush(self.calls, (time.monotonic() + delay, next(self.sequence), function))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.calls or self.calls[0][0] > time.monotonic():
+                    self.condition.wait(self.calls[0][0] - time.monotonic() if self.calls else None)
+                function = heapq.heappop(self.calls)[2]
+            try:
+                function()
             except Exception as e:
-                logger.error(f"Error in log stream generator: {e}", exc_info=True)
-                try:
-                    yield f"data: Error in log stream: {e}\n\n"
-                except Exception:
-                    logger.error("Failed to yield error message to log stream client.")
-                    return
-                time.sleep(5)
+                logger.error(f"Delayed call failed: {e}", exc_info=True)
 
-    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
+circuit_breaker = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN, BREAKER_MAX_COOLDOWN)
+retry_timer = DelayedCalls("retry-timer")
+Gauge("easyeda_circuit_breaker_open", "1 while conversions are paused after repeated upstream failures.",
+      function=lambda: int(circuit_breaker.state != "closed"))
+Gauge("easyeda_retries_scheduled", "Parts waiting for their backoff delay before a retry.",
+      function=lambda: len(retry_timer.calls))
+conversion_executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_CONVERSIONS, thread_name_prefix="worker")
+conversion_executor_size = MAX_PARALLEL_CONVERSIONS
 
-@app.route("/", methods=["GET", "POST"])
-def index():
-    global DISABLE_CLEANUP
 
-    # Read configuration at the start of the index function (or ideally, app startup)
+def apply_conversion_settings():
+    """Resize the rate limiter and the conversion pool after the add-on config was reloaded.
+    Parts already submitted finish on the previous pool."""
+    global conversion_executor, conversion_executor_size
+    upstream_rate_limiter.configure(UPSTREAM_RATE_LIMIT, MAX_PARALLEL_CONVERSIONS)
+    if conversion_executor_size != MAX_PARALLEL_CONVERSIONS:
+        previous = conversion_executor
+        conversion_executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_CONVERSIONS, thread_name_prefix="worker")
+        conversion_executor_size = MAX_PARALLEL_CONVERSIONS
+        previous.shutdown(wait=False)
+        logger.info(f"Now converting up to {MAX_PARALLEL_CONVERSIONS} parts at the same time.")
+
+
+# Source of the long-lived converter worker. It is started with `python -c` so that it
+# imports easyeda2kicad once (and none of this web app), then converts one part per JSON
+# request line read from stdin. Conversion output is streamed on stdout as-is, and each
+# request is answered by a single line starting with the result marker (argv[1]).
+# The EasyEDA API calls are wrapped so that component data and 3D models are served from
+# (and stored in) the per-LCSC-ID component cache described by the request.
+CONVERTER_WORKER_SOURCE = r"""
+import json
+import logging
+import os
+import sys
+import time
+import traceback
+
+sys.stderr = sys.stdout
+marker = sys.argv[1]
+from easyeda2kicad.__main__ import main
+from easyeda2kicad.easyeda.easyeda_api import EasyedaApi
+
+cache = {}
+cache_stats = {"cache_hits": 0, "cache_misses": 0, "fetch_seconds": 0}
+spans = []  # [name, wall-clock start, duration, detail] of the current request
+
+
+def timed_fetch(name, fetch):
+    started = time.time()
     try:
-        addon_config_path = '/config/addons/local/easyeda_to_kicad_web/config.json'
-        if os.path.exists(addon_config_path):
-            with open(addon_config_path, 'r') as f:
-                addon_config = json.load(f)
-                DISABLE_CLEANUP = addon_config.get('disable_auto_cleanup', False)
-                logger.info(f"Automatic cleanup is {'disabled' if DISABLE_CLEANUP else 'enabled'} based on config.")
-        else:
-            logger.warning(f"Configuration file not found at: {addon_config_path}. Using default cleanup settings.")
-    except Exception as e:
-        logger.error(f"Error reading add-on configuration: {e}", exc_info=True)
-        logger.warning("Using default cleanup settings.")
+        return fetch()
+    finally:
+        duration = time.time() - started
+        cache_stats["fetch_seconds"] += duration
+        spans.append(["upstream_fetch" if name == "cad_data.json" else "3d_download", started, duration, name])
+
+
+def traced(owner, attr, span_name):
+    function = getattr(owner, attr, None)
+    if function is None:
+        return
+
+    def wrapper(*args, **kwargs):
+        started = time.time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            spans.append([span_name, started, time.time() - started, None])
+    setattr(owner, attr, wrapper)
 
-    output = ""  # For general status messages
-    processing_results = {"processed": [], "skipped": [], "failed": [], "warnings": []}
-    library_root_abs = os.path.abspath(os.path.join(OUTPUT_BASE, LIBRARY_ROOT_NAME))
 
+def cached(lcsc_id, name, fetch):
+    if not cache or not lcsc_id:
+        return timed_fetch(name, fetch)
+    entry_dir = os.path.join(cache["dir"], lcsc_id)
+    path = os.path.join(entry_dir, name)
     try:
-        os.makedirs(library_root_abs, exist_ok=True)
-        logger.debug(f"Library root directory: {library_root_abs}")
-    except Exception as e:
-        logger.error(f"Error creating/accessing library root directory {library_root_abs}: {str(e)}", exc_info=True)
-        abort(500, description=f"Fatal Error: Cannot create or access library root directory at {library_root_abs}")
+        if cache["offline"] or time.time() - os.path.getmtime(path) < cache["ttl"]:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(entry_dir)
+            cache_stats["cache_hits"] += 1
+            return data
+    except OSError:
+        pass
+    cache_stats["cache_misses"] += 1
+    if cache["offline"]:
+        print(f"[cache] Offline mode: {name} for {lcsc_id} is not cached")
+        return None
+    data = timed_fetch(name, fetch)
+    if data:
+        os.makedirs(entry_dir, exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        os.utime(entry_dir)
+    return data
+
+
+api_get_cad_data = EasyedaApi.get_cad_data_of_component
+api_get_raw_3d_model_obj = EasyedaApi.get_raw_3d_model_obj
+api_get_step_3d_model = EasyedaApi.get_step_3d_model
+
+
+def get_cad_data_of_component(self, lcsc_id):
+    def fetch():
+        cad_data = api_get_cad_data(self, lcsc_id=lcsc_id)
+        return json.dumps(cad_data).encode("utf-8") if cad_data else None
+    data = cached(lcsc_id, "cad_data.json", fetch)
+    return json.loads(data) if data else {}
+
 
-    current_library = get_latest_library_folder(library_root_abs) or DEFAULT_LIBRARY_NAME
-    library_base_dir = os.path.join(library_root_abs, current_library)
-    os.makedirs(library_base_dir, exist_ok=True)  # Ensure library directory exists
+def get_raw_3d_model_obj(self, uuid):
+    def fetch():
+        obj = api_get_raw_3d_model_obj(self, uuid=uuid)
+        return obj.encode("utf-8") if obj else None
+    data = cached(cache.get("lcsc_id"), f"{uuid}.obj", fetch)
+    return data.decode("utf-8") if data else None
 
-    processed_ids_log_path = os.path.join(library_base_dir, ".processed_lcsc_ids.log")
-    processed_ids_set = set()
 
-    # Read existing processed IDs
+def get_step_3d_model(self, uuid):
+    return cached(cache.get("lcsc_id"), f"{uuid}.step", lambda: api_get_step_3d_model(self, uuid=uuid))
+
+
+EasyedaApi.get_cad_data_of_component = get_cad_data_of_component
+EasyedaApi.get_raw_3d_model_obj = get_raw_3d_model_obj
+EasyedaApi.get_step_3d_model = get_step_3d_model
+
+# The exporters write the symbol, footprint and 3D model files (names differ between versions)
+for module_name, class_name, attrs, span_name in (
+        ("easyeda2kicad.kicad.export_kicad_symbol", "ExporterSymbolKicad", ("save_to_lib", "export"), "symbol_write"),
+        ("easyeda2kicad.kicad.export_kicad_footprint", "ExporterFootprintKicad", ("export",), "footprint_write"),
+        ("easyeda2kicad.kicad.export_kicad_3d_model", "Exporter3dModelKicad", ("export",), "3d_model_write")):
     try:
-        if os.path.exists(processed_ids_log_path):
-            with open(processed_ids_log_path, 'r') as f_log:
-                processed_ids_set = {line.strip() for line in f_log if line.strip()}
-            logger.info(
-                f"Read {len(processed_ids_set)} processed IDs from {processed_ids_log_path} for library '{current_library}'")
-    except Exception as read_log_err:
-        logger.error(f"Error reading processed IDs log {processed_ids_log_path}: {read_log_err}", exc_info=True)
-        processing_results["warnings"].append(
-            f"Could not read processed IDs log for library '{current_library}'. Duplicate checks might be unreliable.")
+        exporter = getattr(__import__(module_name, fromlist=[class_name]), class_name)
+    except (ImportError, AttributeError):
+        continue
+    for attr in attrs:
+        if attr in vars(exporter):
+            traced(exporter, attr, span_name)
+            break
+
+
+def rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except Exception:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+print(marker + json.dumps({"ready": True, "rss_kb": rss_kb()}), flush=True)
+for request_line in sys.stdin:
+    request = json.loads(request_line)
+    cache = request.get("cache") or {}
+    cache_stats = dict.fromkeys(cache_stats, 0)
+    spans = []
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    try:
+        returncode = main(request["argv"]) or 0
+    except SystemExit as exit_err:
+        returncode = exit_err.code if isinstance(exit_err.code, int) else 1
+    except Exception:
+        traceback.print_exc(file=sys.stdout)
+        returncode = 1
+    sys.stdout.flush()
+    print(marker + json.dumps(dict(cache_stats, returncode=returncode, rss_kb=rss_kb(), spans=spans)), flush=True)
+"""
+WORKER_RESULT_MARKER = "@@easyeda_to_kicad_worker@@ "
+ANSI_ESCAPE_RE = re.compile(r'\x1b\[[0-9;?]*[ -/]*[@-~]')
 
-    if request.method == "POST":
-        lcsc_list_to_process = []
-        skipped_ids = []
-        input_ids = []  # To track all submitted IDs for final feedback
-
-        lcsc_id_input = request.form.get('lcsc_id', '').strip()
-        if lcsc_id_input:
-            input_ids.append(lcsc_id_input)
-            if re.match(r'^[Cc]\d+$', lcsc_id_input):
-                if lcsc_id_input in processed_ids_set:
-                    skipped_ids.append(lcsc_id_input)
-                    logger.info(f"Skipping already processed LCSC ID: {lcsc_id_input} in library '{current_library}'")
-                else:
-                    lcsc_list_to_process.append(lcsc_id_input)
-            else:
-                processing_results["warnings"].append(
-                    f"Invalid LCSC ID format: '{lcsc_id_input}'. Must be like C123456.")
-                logger.warning(f"Invalid LCSC ID format: '{lcsc_id_input}'")
 
-        if 'csv_file' in request.files and request.files['csv_file'].filename:
-            csv_file = request.files['csv_file']
+def clean_output_line(line):
+    """A line of converter output without colour codes and surrounding whitespace."""
+    return ANSI_ESCAPE_RE.sub('', line).strip()
+
+
+class ConverterWorkerError(Exception):
+    pass
+
+
+class ConverterWorker:
+    """A warm easyeda2kicad process that converts parts over a stdin/stdout pipe."""
+
+    def __init__(self):
+        self.jobs_done = 0
+        self.rss_kb = 0
+        started = time.monotonic()
+        self.process = subprocess.Popen(
+            [sys.executable, "-u", "-c", CONVERTER_WORKER_SOURCE, WORKER_RESULT_MARKER],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+            encoding='utf-8', errors='replace', bufsize=1
+        )
+        startup_output = []
+        result = self._read_result(startup_output.append)
+        if not result.get("ready"):
+            self.close()
+            raise ConverterWorkerError("Converter worker did not start: " + " | ".join(startup_output[-5:]))
+        self.rss_kb = result["rss_kb"]
+        STAGE_SECONDS.observe(time.monotonic() - started, stage="worker_spawn")
+        job_tracer.finish("worker_spawn", time.monotonic() - started)
+        logger.info(f"Started converter worker pid {self.process.pid}")
+
+    def _read_result(self, on_line):
+        for line in self.process.stdout:
+            if line.startswith(WORKER_RESULT_MARKER):
+                return json.loads(line[len(WORKER_RESULT_MARKER):])
+            clean_line = clean_output_line(line)
+            if clean_line:
+                on_line(clean_line)
+        raise ConverterWorkerError(f"Converter worker pid {self.process.pid} exited with code {self.process.wait()}")
+
+    def convert(self, request, on_line):
+        """Run one easyeda2kicad request, passing every output line to on_line. Returns the result record."""
+        self.process.stdin.write(json.dumps(request) + "\n")
+        self.process.stdin.flush()
+        result = self._read_result(on_line)
+        self.jobs_done += 1
+        self.rss_kb = result["rss_kb"]
+        return result
+
+    def worn_out(self):
+        return self.jobs_done >= WORKER_MAX_JOBS or self.rss_kb > WORKER_MAX_RSS_MB * 1024
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except Exception:
+            self.process.kill()
+
+
+class ConverterPool:
+    """Pool of warm converter workers, recycled after WORKER_MAX_JOBS parts or WORKER_MAX_RSS_MB."""
+
+    def __init__(self):
+        self.idle = Queue()
+        self.disabled = False
+
+    def acquire(self):
+        while True:
             try:
-                csv_data = csv_file.read().decode('utf-8-sig')
-                reader = csv.DictReader(csv_data.splitlines())
-                lcsc_column_found = False
-                if reader.fieldnames and 'LCSC' in reader.fieldnames:
-                    lcsc_column_found = True
-                    for row in reader:
-                        _id = row.get('LCSC', '').strip()
-                        if _id:
-                            input_ids.append(_id)
-                            if re.match(r'^[Cc]\d+$', _id):
-                                if _id in processed_ids_set:
-                                    skipped_ids.append(_id)
-                                    logger.info(
-                                        f"Skipping already processed LCSC ID from CSV: {_id} in library '{current_library}'")
-                                else:
-                                    lcsc_list_to_process.append(_id)
-                            else:
-                                processing_results["warnings"].append(f"Invalid LCSC ID format found in CSV: '{_id}'")
-                                logger.warning(f"Invalid LCSC ID format found in CSV: '{_id}'")
-                if not lcsc_column_found:
-                    processing_results["warnings"].append("CSV file must contain an 'LCSC' column.")
-                elif not lcsc_list_to_process and not skipped_ids:
-                    processing_results["warnings"].append("No valid or new LCSC IDs found in CSV file.")
-            except UnicodeDecodeError:
-                processing_results["errors"].append("Could not read CSV file. Please ensure it is UTF-8 encoded.")
-                logger.error("UnicodeDecodeError reading CSV")
-            except csv.Error as csv_err:
-                processing_results["errors"].append(f"Could not parse CSV file: {csv_err}")
-                logger.error(f"CSV Error: {csv_err}")
-            except Exception as read_err:
-                processing_results["errors"].append(f"Could not process CSV file: {read_err}")
-                logger.error(f"Error reading CSV file: {read_err}", exc_info=True)
+                worker = self.idle.get_nowait()
+            except Empty:
+                return ConverterWorker()
+            if worker.process.poll() is None:
+                return worker
 
-        processed_ids = []
-        failed_ids = []
+    def release(self, worker, healthy=True):
+        if healthy and worker.process.poll() is None and not worker.worn_out():
+            self.idle.put(worker)
+            return
+        logger.info(f"Recycling converter worker pid {worker.process.pid} after {worker.jobs_done} parts "
+                    f"({worker.rss_kb // 1024} MB RSS)")
+        worker.close()
 
-        if lcsc_list_to_process:
-            logger.info(f"Processing {len(lcsc_list_to_process)} new LCSC IDs into library folder '{current_library}'")
-            log_queue.put(f"Starting conversion for {len(lcsc_list_to_process)} new LCSC IDs into library '{current_library}'...")
-            for item_id in lcsc_list_to_process:
-                temp_dir = None
-                conversion_ok = False
-                organization_ok = False
-                try:
-                    temp_base = os.path.join(OUTPUT_BASE, "temp")
-                    os.makedirs(temp_base, exist_ok=True)
-                    temp_dir = os.path.join(temp_base, f"temp_{item_id}_{int(time.time())}")
-                    os.makedirs(temp_dir, exist_ok=True)
-
-                    logger.info(f"Running easyeda2kicad for {item_id} using output prefix {temp_dir}")
-                    log_queue.put(f"Converting {item_id}...")
-                    process = subprocess.Popen(
-                        ["easyeda2kicad", "--lcsc_id", item_id, "--full", "--output", temp_dir],
-                        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8',
-                        errors='replace'
-                    )
-                    for line in process.stdout:
-                        clean_line = line.strip()
-                        if clean_line:
-                            logger.info(f"[{item_id}] {clean_line}")
-                            log_queue.put(f"[{item_id}] {clean_line}")
-                    process.wait()
-
-                    if process.returncode != 0:
-                        failed_ids.append(item_id)
-                        err_msg = f"Conversion failed for {item_id} with exit code {process.returncode}"
-                        logger.error(err_msg)
-                        log_queue.put(f"[ERROR] {err_msg}")
-                        # Attempt cleanup even on failure
-                        organize_files(temp_dir, library_base_dir)  # Pass prefix
-                    else:
-                        conversion_ok = True
-                        logger.info(f"Successfully converted {item_id}. Organizing files...");
-                        log_queue.put(f"Conversion successful for {item_id}. Organizing...")
-                        # Call the NEW organize_files, passing the prefix path
-                        organization_ok = organize_files(temp_dir, library_base_dir)  # Returns True on success
-                        if organization_ok:
-                            processed_ids.append(item_id)
-                            # Add to processed IDs log
-                            try:
-                                with open(processed_ids_log_path, 'a') as f_log:
-                                    f_log.write(f"{item_id}\n")
-                                processed_ids_set.add(item_id)  # Update the in-memory set
-                                logger.info(
-                                    f"Successfully processed and logged LCSC ID: {item_id} to {processed_ids_log_path}")
-                                log_queue.put(f"Successfully added {item_id} to library '{current_library}'.")
-                            except Exception as log_err:
-                                logger.error(f"Error writing to processed IDs log {processed_ids_log_path}: {log_err}",
-                                             exc_info=True)
-                                processing_results["warnings"].append(
-                                    f"Could not update processed IDs log for '{current_library}'.")
-                        else:
-                            failed_ids.append(item_id)
-                            logger.error(f"File organization failed for {item_id}.")
-                            log_queue.put(f"[ERROR] File organization failed for {item_id}.")
-
-                except Exception as e:
-                    failed_ids.append(item_id)
-                    logger.error(f"Exception during processing of {item_id}: {str(e)}", exc_info=True)
-                    log_queue.put(f"[ERROR] Exception during processing of {item_id}: {str(e)}")
-                finally:
-                    if temp_dir and os.path.exists(temp_dir):
-                        try:
-                            shutil.rmtree(temp_dir)
-                            logger.debug(f"Cleaned up temporary directory: {temp_dir}")
-                        except Exception as cleanup_err:
-                            logger.error(f"Error cleaning up temporary directory {temp_dir}: {cleanup_err}",
-                                         exc_info=True)
-
-            processing_results["processed"].extend(processed_ids)
-            processing_results["skipped"].extend(skipped_ids)
-            processing_results["failed"].extend(failed_ids)
-        elif output:
-            processing_results["warnings"].append(output)
-        elif skipped_ids:
-            processing_results["skipped"].extend(skipped_ids)
-        elif 'csv_file' in request.files and not request.files['csv_file'].filename and not lcsc_id_input:
-            output = "Please enter an LCSC ID or upload a CSV file."
-            processing_results["warnings"].append(output)
-        elif not input_ids and request.method == "POST":
-            output = "No LCSC IDs provided."
-            processing_results["warnings"].append(output)
 
-    # Determine the directory to display
-    display_path_rel = request.args.get('path', '.')
-    display_path_abs = os.path.abspath(os.path.join(library_base_dir, display_path_rel))
+converter_pool = ConverterPool()
 
-    # Security check to prevent Browse outside the library root
-    if not display_path_abs.startswith(os.path.abspath(library_base_dir)):
-        logger.warning(f"Attempted to access path outside library root: {display_path_abs}")
-        abort(403)
 
-    directory_listing_html = render_directory_listing(display_path_abs, library_base_dir)
+def component_cache_settings(item_id):
+    if CACHE_MAX_MB <= 0:
+        return None
+    return {"dir": COMPONENT_CACHE_DIR, "lcsc_id": item_id, "ttl": CACHE_TTL_DAYS * 86400, "offline": OFFLINE_MODE}
 
-    return render_template_string(HTML,
-                                   current_library=current_library,
-                                   directory_listing_html=directory_listing_html,
-                                   current_display_path=os.path.relpath(display_path_abs, library_base_dir) if display_path_abs != library_base_dir else ".",
-                                   output=output,
-                                   processing_results=processing_results if request.method == "POST" else None)
+
+def evict_component_cache():
+    """Drop expired component cache entries, then least recently used ones until under CACHE_MAX_MB."""
+    if not os.path.isdir(COMPONENT_CACHE_DIR):
+        return
+    entries = []
+    total_size = 0
+    expired_before = time.time() - CACHE_TTL_DAYS * 86400
+    for entry in os.scandir(COMPONENT_CACHE_DIR):
+        if not entry.is_dir():
+            continue
+        try:
+            size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+            entries.append((entry.stat().st_mtime, size, entry.path))
+            total_size += size
+        except OSError as e:
+            logger.warning(f"Could not inspect cache entry {entry.path}: {e}")
+    entries.sort()
+    removed = 0
+    for last_used, size, path in entries:
+        if total_size <= CACHE_MAX_MB * 1024 * 1024 and (OFFLINE_MODE or last_used >= expired_before):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total_size -= size
+        removed += 1
+    if removed:
+        logger.info(f"Component cache: evicted {removed} entries, {total_size // 1024} KB left")
 
 
-@app.route('/download/<path:filename>')
-def download_file(filename):
-    full_path = os.path.join(OUTPUT_BASE, filename)
-    if not os.path.isfile(full_path):
-        abort(404)
-    # Security check: Ensure the requested file is within the OUTPUT_BASE
-    if not os.path.abspath(full_path).startswith(os.path.abspath(OUTPUT_BASE)):
-        logger.warning(f"Attempted to download file outside OUTPUT_BASE: {full_path}")
-        abort(403)
-    return send_from_directory(OUTPUT_BASE, filename, as_attachment=True)
+def run_easyeda2kicad(item_id, argv, output=None):
+    """Run easyeda2kicad for one part, streaming its output to the logs (and into the output list).
+    Returns the exit code."""
+    def on_line(clean_line):
+        logger.info(f"[{item_id}] {clean_line}")  # Also reaches the /logs subscribers
+        if output is not None:
+            output.append(clean_line)
+
+    started = time.monotonic()
+    try:
+        return run_converter(item_id, argv, on_line)
+    finally:
+        STAGE_SECONDS.observe(time.monotonic() - started, stage="easyeda2kicad")
+        job_tracer.finish("easyeda2kicad", time.monotonic() - started)
+
+
+def run_converter(item_id, argv, on_line):
+    if not converter_pool.disabled:
+        try:
+            worker = converter_pool.acquire()
+        except Exception as e:
+            converter_pool.disabled = True
+            logger.warning(f"Warm converter workers unavailable ({e}). Falling back to one process per part.")
+        else:
+            try:
+                result = worker.convert({"argv": argv, "cache": component_cache_settings(item_id)}, on_line)
+            except Exception:
+                converter_pool.release(worker, healthy=False)
+                raise
+            converter_pool.release(worker)
+            logger.debug(f"[{item_id}] Component cache: {result['cache_hits']} hits, {result['cache_misses']} misses")
+            CACHE_REQUESTS.inc(result["cache_hits"], result="hit")
+            CACHE_REQUESTS.inc(result["cache_misses"], result="miss")
+            if result.get("fetch_seconds"):
+                STAGE_SECONDS.observe(result["fetch_seconds"], stage="upstream_fetch")
+            for name, start, duration, detail in result.get("spans", ()):
+                job_tracer.record(name, start, duration, **({"file": detail} if detail else {}))
+            return result["returncode"]
+
+    if OFFLINE_MODE:
+        logger.warning(f"[{item_id}] Offline mode needs the warm converter workers; fetching from upstream.")
+    process = subprocess.Popen(
+        ["easyeda2kicad"] + argv,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8',
+        errors='replace'
+    )
+    for line in process.stdout:
+        clean_line = clean_output_line(line)
+        if clean_line:
+            on_line(clean_line)
+    return process.wait()
+
+
+# easyeda2kicad catches network errors itself and only logs them ("API request failed: <urlopen
+# error ...>", "Failed to get 3D model ..."), older releases die with a requests traceback, so
+# failures are classified from the output. Transient patterns are checked first: an unknown part
+# and an unreachable API both end with "Failed to fetch data".
+FAILURE_PATTERNS = (
+    ("transient", re.compile(r"urlopen error|HTTP Error (429|5\d\d)|timed out|Timeout|ConnectionError|"
+                             r"Connection (reset|refused|aborted)|RemoteDisconnected|IncompleteRead|"
+                             r"Temporary failure in name resolution|Name or service not known|"
+                             r"Max retries exceeded", re.IGNORECASE)),
+    ("offline", re.compile(r"Offline mode: .* is not cached")),
+    ("not_found", re.compile(r"Failed to fetch data from EasyEDA API|HTTP Error 404")),
+)
+FAILURE_MESSAGES = {
+    "transient": "EasyEDA/LCSC could not be reached, giving up after retries",
+    "worker": "the converter crashed repeatedly",
+    "offline": "not in the component cache (offline mode)",
+    "not_found": "not found on EasyEDA/LCSC",
+    "error": "conversion failed",
+}
+RETRYABLE_FAILURES = ("transient", "worker")
+
+
+def classify_failure(returncode, output):
+    """Failure kind of an easyeda2kicad run from its exit code and output lines, None if it went fine.
+
+    A successful run that still hit a transient error (typically a 3D model download) counts as
+    transient too, so the part can be retried to get complete.
+    """
+    for kind, pattern in FAILURE_PATTERNS if returncode != 0 else FAILURE_PATTERNS[:1]:
+        if any(pattern.search(line) for line in output):
+            return kind
+    return None if returncode == 0 else "error"
+
+
+def convert_part(item_id, library_base_dir, warnings, job_id=None, final_attempt=True):
+    """Convert a single LCSC ID into the library.
+
+    Returns None when the part was added, else the kind of failure (see classify_failure; "worker"
+    when the converter worker crashed). Unless this is the final attempt, a conversion that hit a
+    transient error is discarded so it can be retried.
+    """
+    temp_dir = None
+    started = time.monotonic()
+    ok = False
+    ACTIVE_CONVERSIONS.inc()
+    try:
+        # Each conversion worker gets its own staging area so parallel runs never collide
+        temp_base = os.path.join(OUTPUT_BASE, "temp", threading.current_thread().name)
+        os.makedirs(temp_base, exist_ok=True)
+        temp_dir = os.path.join(temp_base, f"temp_{item_id}_{int(time.time())}")
+        os.makedirs(temp_dir, exist_ok=True)
+
+        logger.info(f"Running easyeda2kicad for {item_id} using output prefix {temp_dir}")
+        log_broker.publish(f"Converting {item_id}...")
+        defer_models = DEFER_3D_MODELS
+        output = []
+        returncode = run_easyeda2kicad(item_id, ["--lcsc_id", item_id] + (["--symbol", "--footprint"] if defer_models
+                                                                          else ["--full"]) + ["--output", temp_dir],
+                                       output)
+        failure = classify_failure(returncode, output)
+
+        if returncode == 0 and failure and not final_attempt:
+            logger.warning(f"Conversion of {item_id} hit a transient upstream error, discarding it for a retry")
+            return failure
+        if returncode != 0:
+            err_msg = f"Conversion failed for {item_id} with exit code {returncode} ({failure})"
+            logger.error(err_msg)
+            log_broker.publish(f"[ERROR] {err_msg}")
+            # Attempt cleanup even on failure
+            organize_files(temp_dir, library_base_dir)  # Pass prefix
+            return failure
+
+        logger.info(f"Successfully converted {item_id}. Organizing files...");
+        log_broker.publish(f"Conversion successful for {item_id}. Organizing...")
+        artifacts = []
+        if not organize_files(temp_dir, library_base_dir, artifacts,
+                              expected=("symbol", "footprint") if defer_models else ARTIFACT_KINDS):
+            logger.error(f"File organization failed for {item_id}.")
+            log_broker.publish(f"[ERROR] File organization failed for {item_id}.")
+            return "error"
+
+        # Add to the library catalog
+        catalog = get_catalog(library_base_dir)
+        try:
+            with job_tracer.span("catalog_update"):
+                catalog.record_part(item_id, artifacts, duration=time.monotonic() - started, job_id=job_id,
+                                    models_pending=defer_models)
+            logger.info(f"Successfully processed and cataloged LCSC ID: {item_id} in {catalog.path}")
+            log_broker.publish(f"Successfully added {item_id} to library '{os.path.basename(library_base_dir)}'"
+                               + (", 3D models pending." if defer_models else "."))
+            if defer_models:
+                model_stage.submit(library_base_dir, item_id)
+        except Exception as catalog_err:
+            logger.error(f"Error writing to catalog {catalog.path}: {catalog_err}", exc_info=True)
+            warnings.append(f"Could not update the catalog of '{os.path.basename(library_base_dir)}'.")
+        ok = True
+        return None
+    except ConverterWorkerError as e:
+        logger.error(f"Converter worker failed while processing {item_id}: {e}")
+        log_broker.publish(f"[ERROR] Converter worker failed while processing {item_id}.")
+        return "worker"
+    except Exception as e:
+        logger.error(f"Exception during processing of {item_id}: {str(e)}", exc_info=True)
+        log_broker.publish(f"[ERROR] Exception during processing of {item_id}: {str(e)}")
+        return "error"
+    finally:
+        ACTIVE_CONVERSIONS.dec()
+        CONVERSION_SECONDS.observe(time.monotonic() - started, result="processed" if ok else "failed")
+        if temp_dir and os.path.exists(temp_dir):
+            try:
+                shutil.rmtree(temp_dir)
+                logger.debug(f"Cleaned up temporary directory: {temp_dir}")
+            except Exception as cleanup_err:
+                logger.error(f"Error cleaning up temporary directory {temp_dir}: {cleanup_err}", exc_info=True)
+
+
+# Deferred 3D models: STEP/WRL downloads are the largest and slowest part of a conversion, so
+# with defer_3d_models a conversion only commits the symbol and footprint (whose model paths
+# already point at the library's 3dshapes folder) and marks the part "3D pending" in the
+# catalog. The models are fetched later by ModelStage, with its own concurrency, only while no
+# conversions are waiting. Pending parts are queued again from the catalogs after a restart.
+MODEL_STAGE_POLL = 2.0  # seconds between checks whether conversions are still pending
+
+
+def conversions_pending():
+    with jobs_lock:
+        return any(job_unfinished.values())
+
+
+def fetch_3d_models(item_id, library_base_dir, final_attempt=True):
+    """Fetch the 3D models of a converted part into its library and clear its "3D pending" mark.
+
+    Returns None when done (also when EasyEDA has no model for the part), else the kind of
+    failure as convert_part does.
+    """
+    temp_dir = None
+    started = time.monotonic()
+    try:
+        temp_base = os.path.join(OUTPUT_BASE, "temp", threading.current_thread().name)
+        os.makedirs(temp_base, exist_ok=True)
+        temp_dir = os.path.join(temp_base, f"temp_{item_id}_3d_{int(time.time())}")
+        os.makedirs(temp_dir, exist_ok=True)
+        output = []
+        returncode = run_easyeda2kicad(item_id, ["--lcsc_id", item_id, "--3d", "--output", temp_dir], output)
+        failure = classify_failure(returncode, output)
+        if failure and (returncode != 0 or not final_attempt):
+            logger.warning(f"Fetching the 3D models of {item_id} failed ({failure})")
+            return failure
+        artifacts = []
+        if not organize_files(temp_dir, library_base_dir, artifacts, expected=()):
+            return "error"
+        if get_catalog(library_base_dir).add_models(item_id, artifacts):
+            names = ", ".join(artifact["name"] for artifact in artifacts) or "none available"
+            logger.info(f"3D models of {item_id} added to library '{os.path.basename(library_base_dir)}': {names}")
+            log_broker.publish(f"3D models of {item_id} added: {names}.")
+        return None
+    except ConverterWorkerError as e:
+        logger.error(f"Converter worker failed while fetching the 3D models of {item_id}: {e}")
+        return "worker"
+    except Exception as e:
+        logger.error(f"Exception while fetching the 3D models of {item_id}: {e}", exc_info=True)
+        return "error"
+    finally:
+        STAGE_SECONDS.observe(time.monotonic() - started, stage="3d_models")
+        for path in (temp_dir, f"{temp_dir}.3dshapes") if temp_dir else ():
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class ModelStage:
+    """Low-priority queue of parts whose 3D models are still to be fetched, worked off by
+    MAX_PARALLEL_3D_DOWNLOADS daemon threads."""
+
+    def __init__(self):
+        self.queue = Queue()
+        self.lock = threading.Lock()
+        self.pending = set()  # (library_dir, lcsc_id) queued or waiting for a retry
+        self.threads = []
+
+    def submit(self, library_dir, lcsc_id, attempt=0):
+        with self.lock:
+            if attempt == 0:
+                if (library_dir, lcsc_id) in self.pending:
+                    return
+                self.pending.add((library_dir, lcsc_id))
+            while len(self.threads) < MAX_PARALLEL_3D_DOWNLOADS:
+                thread = threading.Thread(target=self.work, name=f"models_{len(self.threads)}", daemon=True)
+                self.threads.append(thread)
+                thread.start()
+        self.queue.put((library_dir, lcsc_id, attempt))
+
+    def resume(self, library_dirs):
+        """Queue the parts left "3D pending" by a restart."""
+        for library_dir in filter(has_catalog, library_dirs):
+            lcsc_ids = get_catalog(library_dir).pending_models()
+            for lcsc_id in lcsc_ids:
+                self.submit(library_dir, lcsc_id)
+            if lcsc_ids:
+                logger.info(f"Queued {len(lcsc_ids)} parts of '{os.path.basename(library_dir)}' for 3D models")
+
+    def work(self):
+        while True:
+            library_dir, lcsc_id, attempt = self.queue.get()
+            with self.lock:
+                # max_parallel_3d_downloads was lowered: hand the part back and stop
+                retired = self.threads.index(threading.current_thread()) >= MAX_PARALLEL_3D_DOWNLOADS
+                if retired:
+                    self.threads.remove(threading.current_thread())
+            if retired:
+                self.queue.put((library_dir, lcsc_id, attempt))
+                return
+            while conversions_pending():
+                time.sleep(MODEL_STAGE_POLL)
+            retrying = False
+            try:
+                retrying = self.fetch(library_dir, lcsc_id, attempt)
+            except Exception as e:
+                logger.error(f"[{lcsc_id}] 3D model stage error: {e}", exc_info=True)
+            if not retrying:
+                with self.lock:
+                    self.pending.discard((library_dir, lcsc_id))
+
+    def fetch(self, library_dir, lcsc_id, attempt):
+        """Fetch the models of one part. Returns True when a retry was scheduled."""
+        catalog = get_catalog(library_dir)
+        if lcsc_id not in catalog:
+            return False  # Removed by cleanup in the meantime
+        probe = circuit_breaker.wait()
+        upstream_rate_limiter.acquire()
+        failure = fetch_3d_models(lcsc_id, library_dir, final_attempt=attempt >= MAX_RETRIES)
+        circuit_breaker.record(failure, probe)
+        if failure in RETRYABLE_FAILURES and attempt < MAX_RETRIES:
+            retry_timer.call_later(retry_delay(attempt + 1), lambda: self.submit(library_dir, lcsc_id, attempt + 1))
+            return True
+        if failure:
+            logger.warning(f"[{lcsc_id}] Giving up on the 3D models: {FAILURE_MESSAGES[failure]}")
+            catalog.add_models(lcsc_id, [])
+        return False
+
+
+model_stage = ModelStage()
+Gauge("easyeda_3d_models_pending", "Parts whose 3D models are queued or waiting for a retry.",
+      function=lambda: len(model_stage.pending))
+
+
+# Background jobs: POST / only enqueues work, the scheduler starts a thread per job and the
+# job record (including the processing results) is kept on disk under JOBS_DIR. Jobs run side
+# by side on the shared conversion pool; a part requested by two jobs at once is converted
+# once (see SingleFlight).
+# While a job is unfinished every item state change is also appended to its journal, so a
+# job cut off by a restart is resumed where it stopped (see resume_job).
+JOBS_DIR = os.path.join(OUTPUT_BASE, "jobs")
+JOB_HISTORY_LIMIT = 100
+JOB_ACTIVE_STATES = ("queued", "running")
+JOB_FINAL_ITEM_STATES = ("processed", "skipped", "failed")
+JOB_SAVE_INTERVAL = 2.0  # seconds between progress saves of a running job record
+jobs = {}
+jobs_lock = threading.Lock()
+jobs_changed = threading.Condition(jobs_lock)  # Notified whenever a part of a job reaches a final state
+job_save_lock = threading.Lock()
+job_queue = Queue()
+job_feeds = {}  # job id -> Queue of LCSC IDs still to be scheduled, None marks the end of the input
+job_unfinished = {}  # job id -> parts scheduled but not final yet, including those waiting for a retry
+job_listeners = {}  # job id -> Queue that receives every finished part (see /api/v1/convert)
+job_last_saved = {}
+job_journals = {}  # job id -> JobJournal of an unfinished job
+
+
+def save_job(job, force=True):
+    """Write a job record to disk. Progress saves (force=False) are throttled to JOB_SAVE_INTERVAL."""
+    job_path = os.path.join(JOBS_DIR, f"{job['id']}.json")
+    try:
+        with job_save_lock:
+            now = time.monotonic()
+            if not force and now - job_last_saved.get(job["id"], 0) < JOB_SAVE_INTERVAL:
+                return
+            job_last_saved[job["id"]] = now
+            with jobs_lock:
+                data = json.dumps(job, indent=2)
+            os.makedirs(JOBS_DIR, exist_ok=True)
+            with open(job_path + ".tmp", 'w') as f:
+                f.write(data)
+            os.replace(job_path + ".tmp", job_path)
+    except Exception as e:
+        logger.error(f"Error saving job record {job_path}: {e}", exc_info=True)
+
+
+class JobJournal:
+    """Append-only NDJSON journal of an unfinished job.
+
+    Lines are {"item": <LCSC ID>, "state": <item state>[, "warnings": [...]]} or
+    {"event": "input_closed", "skipped": [...], "warnings": [...]}. Appends are fsync'd unless
+    sync=False, which is used for newly queued IDs: losing those only loses input the restart
+    cut off anyway.
+    """
+
+    def __init__(self, job_id):
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        self.path = self.journal_path(job_id)
+        self.lock = threading.Lock()
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def journal_path(job_id):
+        return os.path.join(JOBS_DIR, f"{job_id}.journal")
+
+    @classmethod
+    def read(cls, job_id):
+        """The journal entries of a job, or None if it has no journal."""
+        entries = []
+        try:
+            with open(cls.journal_path(job_id), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        break  # Torn last line of a crash
+        except FileNotFoundError:
+            return None
+        return entries
+
+    def append(self, entries, sync=True):
+        data = "".join(json.dumps(entry) + "\n" for entry in entries)
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.write(data)
+            self.file.flush()
+            if sync:
+                os.fsync(self.file.fileno())
+
+    def remove(self):
+        with self.lock:
+            self.file.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def append_journal(job_id, entries, sync=True):
+    journal = job_journals.get(job_id)
+    if journal is None or not entries:
+        return
+    try:
+        journal.append(entries, sync=sync)
+    except Exception as e:
+        logger.error(f"Error writing the journal of job {job_id}: {e}", exc_info=True)
+
+
+def finish_journal(job_id):
+    """Drop the journal of a job whose final record has been saved."""
+    journal = job_journals.pop(job_id, None)
+    if journal:
+        journal.remove()
+
+
+def resume_job(job):
+    """Rebuild an unfinished job from its journal and queue the parts it had not finished.
+
+    Parts found in the library catalog count as processed: they were committed but the restart
+    came before that was journaled. Returns False when the job has no journal.
+    """
+    entries = JobJournal.read(job["id"])
+    if entries is None:
+        return False
+    items = {}
+    results = {"processed": [], "skipped": [], "failed": [], "warnings": []}
+    input_closed = False
+    for entry in entries:
+        if "item" in entry:
+            items[entry["item"]] = entry["state"]
+            if entry["state"] in JOB_FINAL_ITEM_STATES:
+                results[entry["state"]].append(entry["item"])
+                results["warnings"].extend(entry.get("warnings", []))
+        elif entry.get("event") == "input_closed":
+            input_closed = True
+            results["skipped"].extend(entry["skipped"])
+            results["warnings"].extend(entry["warnings"])
+    catalog = get_catalog(job["library_dir"])
+    remaining = []
+    new_entries = []
+    for item_id, state in items.items():
+        if state in JOB_FINAL_ITEM_STATES:
+            continue
+        if item_id in catalog:
+            items[item_id] = "processed"
+            results["processed"].append(item_id)
+            new_entries.append({"item": item_id, "state": "processed"})
+        else:
+            items[item_id] = "queued"
+            remaining.append(item_id)
+    if not input_closed:
+        warning = "The add-on restarted while this job's input was being read; only the IDs read before that are converted."
+        results["warnings"].append(warning)
+        new_entries.append({"event": "input_closed", "skipped": [], "warnings": [warning]})
+    job.update(status="queued", input_open=False, items=items, results=results)
+    feed = Queue()
+    for item_id in remaining:
+        feed.put(item_id)
+    feed.put(None)
+    with jobs_lock:
+        jobs[job["id"]] = job
+        job_feeds[job["id"]] = feed
+        job_unfinished[job["id"]] = len(remaining)
+    job_journals[job["id"]] = JobJournal(job["id"])
+    append_journal(job["id"], new_entries)
+    save_job(job)
+    job_queue.put(job["id"])
+    logger.info(f"Job {job['id']} resumes after a restart: {len(remaining)} of {len(items)} parts left to convert")
+    return True
+
+
+def load_jobs():
+    """Load job records from disk. Jobs that were active when the add-on stopped are resumed from their
+    journal, or marked interrupted when they have none."""
+    if not os.path.isdir(JOBS_DIR):
+        return
+    loaded = []
+    for name in os.listdir(JOBS_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(JOBS_DIR, name), 'r') as f:
+                loaded.append(json.load(f))
+        except Exception as e:
+            logger.error(f"Error reading job record {name}: {e}", exc_info=True)
+    for job in sorted(loaded, key=lambda job: job["created_at"]):  # Resume in submission order
+        jobs[job["id"]] = job
+        if job["status"] not in JOB_ACTIVE_STATES:
+            try:
+                os.remove(JobJournal.journal_path(job["id"]))  # Restart between the final save and its removal
+            except FileNotFoundError:
+                pass
+        else:
+            try:
+                if resume_job(job):
+                    continue
+            except Exception as e:
+                logger.error(f"Could not resume job {job['id']}: {e}", exc_info=True)
+            job["status"] = "interrupted"
+            job["input_open"] = False
+            for item_id, state in job["items"].items():
+                if state in ("queued", "converting", "retrying"):
+                    job["items"][item_id] = "interrupted"
+            save_job(job)
+            logger.warning(f"Job {job['id']} was interrupted by a restart.")
+    logger.info(f"Loaded {len(jobs)} job records from {JOBS_DIR}")
+
+
+def prune_jobs():
+    with jobs_lock:
+        finished = sorted((job for job in jobs.values() if job["status"] not in JOB_ACTIVE_STATES),
+                          key=lambda job: job["created_at"])
+        expired = finished[:max(0, len(jobs) - JOB_HISTORY_LIMIT)]
+        for job in expired:
+            del jobs[job["id"]]
+            job_last_saved.pop(job["id"], None)
+    for job in expired:
+        job_tracer.discard(job["id"])
+        try:
+            os.remove(os.path.join(JOBS_DIR, f"{job['id']}.json"))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Error removing old job record {job['id']}: {e}")
+
+
+def create_job(library_name, library_dir, lcsc_ids=()):
+    """Create and enqueue a job. The job stays open for more IDs (add_job_items) until close_job_input,
+    so conversions can start while the input is still being read."""
+    job = {
+        "id": uuid.uuid4().hex[:12],
+        "status": "queued",
+        "library": library_name,
+        "library_dir": library_dir,
+        "created_at": datetime.now().isoformat(timespec='seconds'),
+        "started_at": None,
+        "finished_at": None,
+        "input_open": True,
+        "items": {},
+        "results": {"processed": [], "skipped": [], "failed": [], "warnings": []},
+    }
+    with jobs_lock:
+        jobs[job["id"]] = job
+        job_feeds[job["id"]] = Queue()
+        job_unfinished[job["id"]] = 0
+    job_journals[job["id"]] = JobJournal(job["id"])
+    add_job_items(job, lcsc_ids)
+    save_job(job)
+    job_queue.put(job["id"])
+    prune_jobs()
+    logger.info(f"Queued job {job['id']} for library '{library_name}'")
+    log_broker.publish(f"Queued job {job['id']} for library '{library_name}'.")
+    return job
+
+
+def add_job_items(job, lcsc_ids):
+    """Append LCSC IDs to an open job; a running job picks them up immediately."""
+    added = []
+    with jobs_lock:
+        feed = job_feeds[job["id"]]
+        for item_id in lcsc_ids:
+            if item_id not in job["items"]:
+                job["items"][item_id] = "queued"
+                feed.put(item_id)
+                added.append({"item": item_id, "state": "queued"})
+        job_unfinished[job["id"]] += len(added)
+    # The journal has the new IDs; the record is saved when the input is closed
+    append_journal(job["id"], added, sync=False)
+
+
+def close_job_input(job, skipped=(), warnings=()):
+    """Mark the end of a job's input and record the IDs and warnings collected while reading it."""
+    with jobs_lock:
+        job["input_open"] = False
+        job["results"]["skipped"].extend(skipped)
+        job["results"]["warnings"].extend(warnings)
+        job_feeds[job["id"]].put(None)
+        total = len(job["items"])
+    append_journal(job["id"], [{"event": "input_closed", "skipped": list(skipped), "warnings": list(warnings)}])
+    save_job(job)
+    logger.info(f"Job {job['id']}: input complete with {total} LCSC IDs to convert")
+
+
+def get_job(job_id):
+    """Return a consistent copy of a job record, or None."""
+    with jobs_lock:
+        job = jobs.get(job_id)
+        return copy.deepcopy(job) if job else None
+
+
+def get_job_status(job_id):
+    with jobs_lock:
+        job = jobs.get(job_id)
+        return job["status"] if job else None
+
+
+def job_progress(job):
+    progress = {"total": len(job["items"]), "queued": 0, "converting": 0, "retrying": 0, "processed": 0,
+                "skipped": 0, "failed": 0, "interrupted": 0}
+    for state in job["items"].values():
+        progress[state] = progress.get(state, 0) + 1
+    progress["done"] = progress["processed"] + progress["skipped"] + progress["failed"]
+    return progress
+
+
+def queued_parts():
+    with jobs_lock:
+        return sum(1 for job in jobs.values() if job["status"] in JOB_ACTIVE_STATES
+                   for state in job["items"].values() if state == "queued")
+
+
+Gauge("easyeda_queued_parts", "Parts of queued and running jobs waiting for a conversion slot.", function=queued_parts)
+Gauge("easyeda_queued_jobs", "Jobs waiting for the scheduler.", function=lambda: job_queue.qsize())
+
+
+def job_summary(job):
+    summary = {key: job.get(key) for key in ("id", "status", "library", "created_at", "started_at", "finished_at",
+                                             "input_open")}
+    summary["progress"] = job_progress(job)
+    return summary
+
+
+def normalize_lcsc_id(raw_id):
+    """Canonical form of an LCSC part number ('C1525' for ' c01525 '), or None if it is not one."""
+    match = re.match(r'^[Cc](\d+)$', raw_id.strip())
+    return f"C{int(match.group(1))}" if match else None
+
+
+class SingleFlight:
+    """Process-wide registry of in-flight conversions, so a part is never converted twice at once.
+
+    The first caller for a key becomes the leader and does the work; later callers wait for the
+    leader's result instead of starting a duplicate fetch and conversion.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+
+    def begin(self, key):
+        """Returns (is_leader, flight)."""
+        with self.lock:
+            if key in self.flights:
+                return False, self.flights[key]
+            flight = {"done": threading.Event(), "result": None}
+            self.flights[key] = flight
+            return True, flight
+
+    def finish(self, key, result):
+        with self.lock:
+            flight = self.flights.pop(key)
+        flight["result"] = result
+        flight["done"].set()
+
+
+in_flight_conversions = SingleFlight()
+
+
+def record_job_item(job, item_id, state, warnings, duration=None):
+    with jobs_lock:
+        job["items"][item_id] = state
+        job["results"][state].append(item_id)
+        job["results"]["warnings"].extend(warnings)
+        if job["id"] in job_unfinished:
+            job_unfinished[job["id"]] -= 1
+            jobs_changed.notify_all()
+        listener = job_listeners.get(job["id"])
+    if listener:
+        listener.put({"lcsc_id": item_id, "status": state, "duration": duration, "errors": warnings})
+    PARTS_TOTAL.inc(result=state)
+    append_journal(job["id"], [{"item": item_id, "state": state, "warnings": warnings}])
+    save_job(job, force=False)
+
+
+def convert_job_item(job, item_id, library_base_dir, queued_at, attempt=0):
+    """Worker-pool task: convert one part of a job and record the result in the job, or schedule
+    a retry after a transient failure."""
+    state, warnings = "failed", []
+    started = time.time()
+    job_tracer.record("queued", queued_at, started - queued_at, job_id=job["id"], item_id=item_id)
+    try:
+        state, warnings = convert_or_join(job, item_id, library_base_dir, attempt)
+    except Exception as e:
+        logger.error(f"[{item_id}] Unexpected error: {e}", exc_info=True)
+    job_tracer.record("part", started, time.time() - started, job_id=job["id"], item_id=item_id, result=state,
+                      attempt=attempt)
+    if state == "retry":
+        schedule_retry(job, item_id, library_base_dir, attempt + 1)
+    else:
+        record_job_item(job, item_id, state, warnings, duration=round(time.time() - started, 3))
+
+
+def schedule_retry(job, item_id, library_base_dir, attempt):
+    """Resubmit a part to the worker pool once its backoff delay has passed."""
+    delay = retry_delay(attempt)
+    with jobs_lock:
+        job["items"][item_id] = "retrying"
+    append_journal(job["id"], [{"item": item_id, "state": "retrying"}], sync=False)
+    logger.warning(f"[{item_id}] Transient failure, retry {attempt} of {MAX_RETRIES} in {delay:.1f}s")
+    log_broker.publish(f"Retrying {item_id} in {delay:.0f}s (attempt {attempt + 1} of {MAX_RETRIES + 1}).",
+                       channel=job["id"])
+    retry_timer.call_later(delay, lambda: conversion_executor.submit(
+        convert_job_item, job, item_id, library_base_dir, time.time(), attempt))
+
+
+def convert_or_join(job, item_id, library_base_dir, attempt=0):
+    """Convert one part, or share the result of a conversion of the same part that is already running.
+
+    Returns (state, warnings) where state is "processed", "failed", "skipped" or "retry" (a
+    transient failure with attempts left).
+    """
+    log_context.job_id = job["id"]
+    log_context.item_id = item_id
+    key = (library_base_dir, item_id)
+    is_leader, flight = in_flight_conversions.begin(key)
+    if not is_leader:
+        logger.info(f"[{item_id}] Already being converted by another job, waiting for its result")
+        with jobs_lock:
+            job["items"][item_id] = "converting"
+        flight["done"].wait()
+        return ("processed" if flight["result"] == "skipped" else flight["result"] or "failed"), []
+    state = "failed"
+    try:
+        # Another job may have finished this part after ours was queued
+        if item_id in get_catalog(library_base_dir):
+            logger.info(f"[{item_id}] Converted by another job in the meantime, skipping")
+            state = "skipped"
+            return state, []
+        with job_tracer.span("breaker_wait"):
+            probe = circuit_breaker.wait()
+        with job_tracer.span("rate_limit_wait"):
+            upstream_rate_limiter.acquire()
+        with jobs_lock:
+            job["items"][item_id] = "converting"
+        append_journal(job["id"], [{"item": item_id, "state": "converting"}])
+        warnings = []
+        failure = convert_part(item_id, library_base_dir, warnings, job_id=job["id"],
+                               final_attempt=attempt >= MAX_RETRIES)
+        circuit_breaker.record(failure, probe)
+        if failure is None:
+            state = "processed"
+        elif failure in RETRYABLE_FAILURES and attempt < MAX_RETRIES:
+            state = "retry"
+            PART_RETRIES.inc(reason=failure)
+        else:
+            warnings.append(f"{item_id}: {FAILURE_MESSAGES[failure]}.")
+        return state, warnings
+    finally:
+        in_flight_conversions.finish(key, state)
+        log_context.job_id = None
+        log_context.item_id = None
+
+
+def run_job(job_id):
+    with jobs_lock:
+        job = jobs[job_id]
+        job["status"] = "running"
+        job["started_at"] = datetime.now().isoformat(timespec='seconds')
+        feed = job_feeds[job_id]
+    save_job(job)
+    library_base_dir = job["library_dir"]
+    os.makedirs(library_base_dir, exist_ok=True)
+    logger.info(f"Job {job_id}: processing new LCSC IDs into library folder '{job['library']}' "
+                f"with {MAX_PARALLEL_CONVERSIONS} parallel workers")
+    log_broker.publish(f"Starting conversion of new LCSC IDs into library '{job['library']}'...")
+
+    # Items are scheduled as they arrive on the feed. Parts waiting for a retry are resubmitted
+    # by the retry timer, so the job is done once every part has reached a final state.
+    while True:
+        item_id = feed.get()
+        if item_id is None:
+            break
+        conversion_executor.submit(convert_job_item, job, item_id, library_base_dir, time.time())
+    with jobs_changed:
+        while job_unfinished[job_id]:
+            jobs_changed.wait()
+        del job_feeds[job_id]
+        del job_unfinished[job_id]
+
+    try:
+        if not conversions_pending():  # Entries still in use by other jobs are not evicted
+            evict_component_cache()
+    except Exception as e:
+        logger.error(f"Error evicting component cache: {e}", exc_info=True)
+
+    with jobs_lock:
+        job["status"] = "completed"
+        job["finished_at"] = datetime.now().isoformat(timespec='seconds')
+        results = job["results"]
+        logger.info(f"Job {job_id} finished: {len(results['processed'])} processed, {len(results['failed'])} failed")
+        log_broker.publish(f"Job {job_id} finished: {len(results['processed'])} processed, {len(results['failed'])} failed.")
+    save_job(job)
+
+
+def job_scheduler():
+    while True:
+        job_id = job_queue.get()
+        threading.Thread(target=job_runner, args=(job_id,), name=f"job_{job_id}", daemon=True).start()
+
+
+def job_runner(job_id):
+    log_context.job_id = job_id
+    try:
+        run_job(job_id)
+    except Exception as e:
+        logger.error(f"Job {job_id} aborted: {e}", exc_info=True)
+        with jobs_lock:
+            job = jobs.get(job_id)
+            if job:
+                job["status"] = "failed"
+                job["finished_at"] = datetime.now().isoformat(timespec='seconds')
+        if job:
+            save_job(job)
+    finally:
+        finish_journal(job_id)
+        job_tracer.save(job_id)
+        log_context.job_id = None
+
+
+recover_staging()
+load_jobs()
+scheduler_thread = threading.Thread(target=job_scheduler, daemon=True)
+scheduler_thread.start()
+
+library_state = LibraryState()
+library_state.start()
+model_stage.resume([library["path"] for library in library_state.snapshot()["libraries"]])
+cleanup_thread = threading.Thread(target=cleanup_old_files, daemon=True)
+cleanup_thread.start()
+
+
+@app.route('/jobs')
+def list_jobs():
+    with jobs_lock:
+        summaries = [job_summary(job) for job in jobs.values()]
+    summaries.sort(key=lambda summary: summary["created_at"], reverse=True)
+    return jsonify({"jobs": summaries})
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = get_job(job_id)
+    if not job:
+        abort(404)
+    job["progress"] = job_progress(job)
+    return jsonify(job)
+
+
+# Waterfall of a job's trace: one row per part (job-level spans such as read_input on top),
+# nested spans drawn as thinner bars on top of the span that contains them.
+TIMELINE_MAX_ROWS = 500
+STAGE_COLORS = {
+    "part": "#cbd5e1", "queued": "#e2e8f0", "read_input": "#94a3b8", "rate_limit_wait": "#fde68a",
+    "worker_spawn": "#f59e0b", "easyeda2kicad": "#93c5fd", "upstream_fetch": "#2563eb", "3d_download": "#7c3aed",
+    "symbol_write": "#10b981", "footprint_write": "#14b8a6", "3d_model_write": "#a855f7",
+    "organize_files": "#fb923c", "library_lock_wait": "#ef4444", "commit_footprint": "#0d9488",
+    "commit_3d_model": "#9333ea", "merge_symbol": "#059669", "catalog_update": "#db2777",
+}
+TIMELINE_HTML = """<!doctype html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>Job {{ job_id }} timeline</title>
+    <style>
+        body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; margin: 1.5rem; color: #333; }
+        table { border-collapse: collapse; margin-bottom: 1.5rem; }
+        td, th { padding: 0.2rem 0.75rem; text-align: right; border-bottom: 1px solid #e1e4e8; }
+        td:first-child, th:first-child { text-align: left; }
+        .swatch { display: inline-block; width: 0.8rem; height: 0.8rem; margin-right: 0.4rem; vertical-align: middle; }
+        .row { display: flex; align-items: center; height: 22px; }
+        .label { width: 8rem; flex: none; font-family: monospace; font-size: 0.8rem; }
+        .lane { position: relative; flex: 1; height: 100%; border-bottom: 1px solid #f0f0f0; }
+        .bar { position: absolute; min-width: 1px; border-radius: 2px; }
+    </style>
+</head>
+<body>
+    <h2>Job {{ job_id }}: {{ total_ms | round(1) }} ms, {{ part_count }} parts</h2>
+    <p><a href="/?job={{ job_id }}">Back to the job</a> | <a href="/jobs/{{ job_id }}/trace">Download Chrome trace</a></p>
+    <table>
+        <tr><th>Stage</th><th>Spans</th><th>Total ms</th><th>Mean ms</th><th>Max ms</th></tr>
+        {% for stage in stages %}
+        <tr><td><span class="swatch" style="background: {{ stage.color }}"></span>{{ stage.name }}</td>
+            <td>{{ stage.count }}</td><td>{{ stage.total_ms | round(1) }}</td>
+            <td>{{ stage.mean_ms | round(1) }}</td><td>{{ stage.max_ms | round(1) }}</td></tr>
+        {% endfor %}
+    </table>
+    {% if hidden_rows %}<p>The first {{ rows | length }} rows are shown, {{ hidden_rows }} more are in the Chrome trace.</p>{% endif %}
+    {% for row in rows %}
+    <div class="row">
+        <div class="label">{{ row.label }}</div>
+        <div class="lane">
+            {% for bar in row.bars %}
+            <div class="bar" title="{{ bar.title }}" style="left: {{ bar.left }}%; width: {{ bar.width }}%; top: {{ bar.top }}px; height: {{ bar.height }}px; background: {{ bar.color }}"></div>
+            {% endfor %}
+        </div>
+    </div>
+    {% endfor %}
+</body>
+</html>
+"""
+
+
+def trace_rows(spans):
+    """Spans grouped by part in order of appearance, job-level spans (item None) first."""
+    rows = {None: []}
+    for span in sorted(spans, key=lambda span: span["start"]):
+        rows.setdefault(span["item"], []).append(span)
+    if not rows[None]:
+        del rows[None]
+    return rows
+
+
+def chrome_trace(job_id, spans):
+    """Chrome trace event format: one complete ("X") event per span, one thread per part."""
+    origin = min((span["start"] for span in spans), default=0)
+    events = [{"name": "process_name", "ph": "M", "pid": 1, "tid": 0, "args": {"name": f"Job {job_id}"}}]
+    for tid, (item_id, row_spans) in enumerate(trace_rows(spans).items()):
+        events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": item_id or "job"}})
+        for span in row_spans:
+            events.append({"name": span["name"], "cat": "conversion", "ph": "X", "pid": 1, "tid": tid,
+                           "ts": round((span["start"] - origin) * 1e6), "dur": round(span["duration"] * 1e6),
+                           "args": dict(span.get("args", {}), thread=span["thread"])})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+@app.route('/jobs/<job_id>/trace')
+def job_trace(job_id):
+    spans = job_tracer.get(job_id)
+    if spans is None:
+        abort(404)
+    return Response(json.dumps(chrome_trace(job_id, spans)), mimetype='application/json',
+                    headers={'Content-Disposition': f'attachment; filename=trace_{job_id}.json'})
+
+
+@app.route('/jobs/<job_id>/timeline')
+def job_timeline(job_id):
+    spans = job_tracer.get(job_id)
+    if spans is None:
+        abort(404)
+    origin = min((span["start"] for span in spans), default=0)
+    total = max((span["start"] + span["duration"] for span in spans), default=0) - origin or 1
+    stage_durations = defaultdict(list)
+    for span in spans:
+        stage_durations[span["name"]].append(span["duration"])
+    stages = [{"name": name, "color": STAGE_COLORS.get(name, "#9ca3af"), "count": len(durations),
+               "total_ms": sum(durations) * 1000, "mean_ms": sum(durations) * 1000 / len(durations),
+               "max_ms": max(durations) * 1000}
+              for name, durations in sorted(stage_durations.items(), key=lambda item: -sum(item[1]))]
+    rows = []
+    grouped = trace_rows(spans)
+    for item_id, row_spans in itertools.islice(grouped.items(), TIMELINE_MAX_ROWS):
+        bars = []
+        open_ends = []  # End times of the enclosing spans
+        for span in sorted(row_spans, key=lambda span: (span["start"], -span["duration"])):
+            end = span["start"] + span["duration"]
+            while open_ends and open_ends[-1] <= span["start"]:
+                open_ends.pop()
+            depth = min(len(open_ends), 3)
+            open_ends.append(end)
+            bars.append({"left": round((span["start"] - origin) / total * 100, 3),
+                         "width": round(span["duration"] / total * 100, 3),
+                         "top": 1 + depth * 3, "height": 20 - depth * 6,
+                         "color": STAGE_COLORS.get(span["name"], "#9ca3af"),
+                         "title": f"{span['name']}: {span['duration'] * 1000:.1f} ms"
+                                  + "".join(f", {key}={value}" for key, value in span.get("args", {}).items())})
+        rows.append({"label": item_id or "job", "bars": bars})
+    return render_template_string(TIMELINE_HTML, job_id=job_id, total_ms=total * 1000, stages=stages, rows=rows,
+                                  part_count=sum(1 for item_id in grouped if item_id),
+                                  hidden_rows=max(0, len(grouped) - TIMELINE_MAX_ROWS))
+
+
+@app.route('/stats')
+def stats():
+    return jsonify({"dedupe": blob_store.get_stats()})
+
+
+# Library search: /search?q=...&mode=prefix|substring[&library=...] looks the query up in the
+# search index of every library catalog (see search_terms), without reading the library files.
+# Exact matches rank before prefix matches, which rank before substring matches.
+SEARCH_MAX_RESULTS = 200
+SEARCH_ROWS_PER_LIBRARY = 2000  # Matching values read from a catalog before ranking
+
+
+@app.route('/search')
+def search_libraries():
+    started = time.perf_counter()
+    query = request.args.get('q', '').strip()
+    mode = request.args.get('mode', 'substring')
+    if mode not in ("prefix", "substring"):
+        abort(400, description="mode must be prefix or substring")
+    limit = min(max(1, request.args.get('limit', 50, type=int)), SEARCH_MAX_RESULTS)
+    state = library_state.snapshot()
+    libraries = [library["name"] for library in state["libraries"]]
+    if request.args.get('library'):
+        if request.args['library'] not in libraries:
+            abort(404)
+        libraries = [request.args['library']]
+    needle = query.lower()
+    hits = {}  # (library, lcsc_id) -> [rank, matched fields]
+    for library in libraries if query else []:
+        catalog = get_catalog(os.path.join(state["library_root"], library))
+        for lcsc_id, field, value in catalog.search(query, prefix=mode == "prefix", limit=SEARCH_ROWS_PER_LIBRARY):
+            rank = (0 if value.lower() == needle else 1 if value.lower().startswith(needle) else 2,
+                    SEARCH_FIELDS.index(field))
+            hit = hits.setdefault((library, lcsc_id), [rank, []])
+            hit[0] = min(hit[0], rank)
+            if field not in hit[1]:
+                hit[1].append(field)
+    ranked = sorted(hits.items(), key=lambda item: (item[1][0], item[0]))[:limit]
+    results = []
+    for library in libraries:
+        found = [(lcsc_id, matched) for (hit_library, lcsc_id), (_, matched) in ranked if hit_library == library]
+        if not found:
+            continue
+        catalog = get_catalog(os.path.join(state["library_root"], library))
+        fields = catalog.search_fields([lcsc_id for lcsc_id, _ in found])
+        for lcsc_id, matched in found:
+            part = catalog.get_part(lcsc_id) or {"artifacts": []}
+            files = [{"kind": artifact["kind"], "name": artifact["name"],
+                      "url": f"/download/{LIBRARY_ROOT_NAME}/{library}/{artifact['path']}"}
+                     for artifact in part["artifacts"]]
+            results.append({"library": library, "lcsc_id": lcsc_id,
+                            "matched": sorted(matched, key=SEARCH_FIELDS.index),
+                            "fields": dict(fields[lcsc_id]), "files": files})
+    order = {key: position for position, (key, _) in enumerate(ranked)}
+    results.sort(key=lambda result: order[(result["library"], result["lcsc_id"])])
+    return jsonify({"query": query, "mode": mode, "results": results, "total": len(hits),
+                    "took_ms": round((time.perf_counter() - started) * 1000, 3)})
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+# On-demand sampling profiler: /admin/profile samples the stack of every thread of the running
+# add-on for a few seconds and reports the hottest functions, or the folded stacks for flame graph
+# tools (speedscope, flamegraph.pl). Unlike cProfile it sees all threads and costs nothing while
+# it is not running. Unless ?idle=1, a thread is only sampled when its CPU clock advanced since the
+# previous sample (or, where per-thread clocks are unavailable, when it is not parked in one of the
+# standard library's waiting primitives), so the report shows where threads are busy, not where they sleep.
+PROFILE_MAX_SECONDS = 60
+PROFILE_INTERVAL_MS = 5
+PROFILE_TOP_FUNCTIONS = 30
+PROFILE_IDLE_MODULES = ("threading.py", "queue.py", "thread.py", "selectors.py", "socket.py", "socketserver.py",
+                        "ssl.py", "hub.py")
+profile_lock = threading.Lock()
+
+
+def thread_cpu_time(ident):
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError, OverflowError):
+        return None
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds, interval, include_idle=False):
+    """Sample all thread stacks. Returns (number of samples, {folded stack: count})."""
+    own_frame = sys._getframe()
+    folded = defaultdict(int)
+    cpu_times = {}
+    samples = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        thread_names = {thread.ident: re.sub(r'_\d+$', '', thread.name) for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if frame is own_frame:
+                continue
+            cpu_time, previous_cpu_time = thread_cpu_time(ident), cpu_times.get(ident)
+            cpu_times[ident] = cpu_time
+            if not include_idle:
+                if cpu_time is not None and previous_cpu_time is not None:
+                    if cpu_time <= previous_cpu_time:
+                        continue
+                elif os.path.basename(frame.f_code.co_filename) in PROFILE_IDLE_MODULES:
+                    continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(thread_names.get(ident, f"thread-{ident}"))
+            folded[";".join(reversed(stack))] += 1
+        samples += 1
+        time.sleep(interval)
+    return samples, folded
+
+
+def profile_report(seconds, interval, samples, folded):
+    own = defaultdict(int)
+    inclusive = defaultdict(int)
+    threads = defaultdict(int)
+    for stack, count in folded.items():
+        frames = stack.split(";")
+        threads[frames[0]] += count
+        own[frames[-1]] += count
+        for label in set(frames[1:]):
+            inclusive[label] += count
+    stack_samples = sum(folded.values()) or 1
+    lines = [f"Sampled {samples} times over {seconds:g}s every {interval * 1000:g} ms, "
+             f"{sum(folded.values())} busy thread stacks", ""]
+    for title, counts in (("Own samples", own), ("Inclusive samples", inclusive)):
+        lines.append(f"{title:>18}  {'%':>6}  Function")
+        for label, count in sorted(counts.items(), key=lambda item: -item[1])[:PROFILE_TOP_FUNCTIONS]:
+            lines.append(f"{count:>18}  {count * 100 / stack_samples:>6.1f}  {label}")
+        lines.append("")
+    lines.append(f"{'Samples':>18}  Thread")
+    lines.extend(f"{count:>18}  {name}" for name, count in sorted(threads.items(), key=lambda item: -item[1]))
+    return "\n".join(lines) + "\n"
+
+
+@app.route('/admin/profile')
+def admin_profile():
+    """Profile the running server. ?seconds=10&interval=5 (ms)&format=text|collapsed&idle=0|1"""
+    seconds = min(max(request.args.get('seconds', 10, type=float), 0.1), PROFILE_MAX_SECONDS)
+    interval = max(request.args.get('interval', PROFILE_INTERVAL_MS, type=float), 1) / 1000
+    include_idle = request.args.get('idle') == '1'
+    if not profile_lock.acquire(blocking=False):
+        return Response("Another profile is being captured, try again later.\n", status=409, mimetype='text/plain')
+    try:
+        logger.info(f"Capturing a {seconds:g}s profile")
+        if GEVENT_PATCHED:
+            # Sample from a real OS thread: it sees whichever greenlet the main thread is running
+            from gevent import get_hub
+            samples, folded = get_hub().threadpool.apply(sample_stacks, (seconds, interval, include_idle))
+        else:
+            samples, folded = sample_stacks(seconds, interval, include_idle)
+    finally:
+        profile_lock.release()
+    if request.args.get('format') == 'collapsed':
+        return Response("".join(f"{stack} {count}\n" for stack, count in sorted(folded.items())),
+                        mimetype='text/plain')
+    return Response(profile_report(seconds, interval, samples, folded), mimetype='text/plain')
+
+
+@app.route('/logs')
+def stream_logs():
+    """Server-sent events stream of log lines. ?job=<id> limits it to one job's lines."""
+    channel = request.args.get('job')
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id', ''))
+    if last_event_id.isdigit():
+        cursor = int(last_event_id)
+    else:
+        cursor = log_broker.replay_cursor(LOG_REPLAY_LINES)
+
+    def generate(cursor):
+        with log_broker.condition:
+            log_broker.subscribers += 1
+        try:
+            while True:
+                cursor, lines = log_broker.read(cursor, channel)
+                if not lines:
+                    yield ": keepalive\n\n"  # Also detects clients that went away
+                for seq, line in lines:
+                    data = "\n".join(f"data: {part}" for part in line.split("\n"))
+                    yield f"id: {seq}\n{data}\n\n"
+        except GeneratorExit:
+            logger.info("Log stream client disconnected.")
+        finally:
+            with log_broker.condition:
+                log_broker.subscribers -= 1
+
+    return Response(generate(cursor), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# Header names used for the LCSC part number by JLCPCB BOM templates, KiCad BOM plugins and exporters,
+# compared case-insensitively with whitespace, '_' and '-' collapsed.
+LCSC_COLUMN_NAMES = ("LCSC", "LCSC Part #", "JLCPCB Part #", "LCSC Part", "LCSC Part Number", "LCSC Part No",
+                     "LCSC#", "LCSC ID", "LCSC Number", "JLCPCB Part", "JLC Part #", "Supplier Part Number")
+
+
+def normalize_column_name(name):
+    return re.sub(r'[\s_\-]+', ' ', name).strip().lower()
+
+
+LCSC_COLUMN_KEYS = [normalize_column_name(name) for name in LCSC_COLUMN_NAMES]
+
+
+def find_lcsc_column(header):
+    """Index of the LCSC part number column in a CSV header row, or None."""
+    if not header:
+        return None
+    columns = [normalize_column_name(name) for name in header]
+    for key in LCSC_COLUMN_KEYS:
+        if key in columns:
+            return columns.index(key)
+    return None
+
+
+# Uploads are decoded from request.stream while they arrive: request.form/request.files would
+# spool the whole body first, and conversions would only start once the upload had finished.
+# A read blocks until a whole chunk has arrived, so the chunk size is the granularity at which
+# rows reach the job.
+MULTIPART_CHUNK_SIZE = 8 * 1024
+
+
+class MultipartReader:
+    """Reads a multipart/form-data body part by part, as it is received."""
+
+    def __init__(self, stream, boundary):
+        self.stream = stream
+        self.decoder = multipart.MultipartDecoder(boundary)
+        self.part_done = True
+
+    def _next_event(self):
+        while True:
+            event = self.decoder.next_event()
+            if not isinstance(event, multipart.NeedData):
+                return event
+            self.decoder.receive_data(self.stream.read(MULTIPART_CHUNK_SIZE) or None)
+
+    def parts(self):
+        """(name, filename) of every part, filename is None for plain fields. Content not read
+        with data() before the next part is skipped."""
+        while True:
+            for _ in self.data():
+                pass
+            event = self._next_event()
+            if isinstance(event, multipart.Epilogue):
+                return
+            if not isinstance(event, (multipart.Field, multipart.File)):
+                continue  # Preamble
+            self.part_done = False
+            yield event.name, getattr(event, "filename", None)
+
+    def data(self):
+        """Byte chunks of the current part."""
+        while not self.part_done:
+            event = self._next_event()
+            self.part_done = not event.more_data
+            if event.data:
+                yield event.data
+
+
+class ChunkStream(io.RawIOBase):
+    """Readable raw stream over an iterator of byte chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending:
+            self.pending = next(self.chunks, None)
+            if self.pending is None:
+                self.pending = b""
+                return 0
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+@app.route("/", methods=["GET", "POST"])
+def index():
+    output = ""  # For general status messages
+    job_id = request.args.get('job')
+    processing_results = {"processed": [], "skipped": [], "failed": [], "warnings": []}
+    state = library_state.snapshot()
+    if state["error"]:
+        abort(500, description=f"Fatal Error: Cannot access the library root directory at {state['library_root']}: "
+                               f"{state['error']}")
+    current_library = state["current_library"]
+    library_base_dir = state["library_dir"]
+    catalog = get_catalog(library_base_dir)
+
+    if request.method == "POST":
+        input_started = time.time()
+        job = None
+        skipped_ids = []
+        input_count = 0  # To track whether any IDs were submitted for final feedback
+        seen_ids = set()
+
+        def add_input_id(raw_id, source=""):
+            nonlocal job, input_count
+            input_count += 1
+            lcsc_id = normalize_lcsc_id(raw_id)
+            if not lcsc_id:
+                processing_results["warnings"].append(
+                    f"Invalid LCSC ID format{source}: '{raw_id}'. Must be like C123456.")
+                logger.warning(f"Invalid LCSC ID format{source}: '{raw_id}'")
+            elif lcsc_id in seen_ids:
+                logger.debug(f"Ignoring duplicate LCSC ID {raw_id}{source}")
+            elif lcsc_id in catalog:
+                seen_ids.add(lcsc_id)
+                skipped_ids.append(lcsc_id)
+                catalog.touch(lcsc_id)
+                PARTS_TOTAL.inc(result="skipped")
+                logger.info(f"Skipping already processed LCSC ID{source}: {lcsc_id} in library '{current_library}'")
+            else:
+                seen_ids.add(lcsc_id)
+                if job is None:
+                    job = create_job(current_library, library_base_dir)
+                add_job_items(job, [lcsc_id])
+
+        def add_csv_ids(chunks):
+            # Parse the upload row by row so conversions start while the rest is still being received
+            csv_text = io.TextIOWrapper(io.BufferedReader(ChunkStream(chunks)), encoding='utf-8-sig', newline='')
+            try:
+                reader = csv.reader(csv_text)
+                lcsc_column = find_lcsc_column(next(reader, None))
+                if lcsc_column is None:
+                    processing_results["warnings"].append(
+                        f"CSV file must contain an LCSC column (e.g. {', '.join(repr(name) for name in LCSC_COLUMN_NAMES[:3])}).")
+                else:
+                    for row in reader:
+                        _id = row[lcsc_column].strip() if len(row) > lcsc_column else ""
+                        if _id:
+                            add_input_id(_id, " found in CSV")
+                    if job is None and not skipped_ids:
+                        processing_results["warnings"].append("No valid or new LCSC IDs found in CSV file.")
+            except UnicodeDecodeError:
+                processing_results["warnings"].append("Could not read CSV file. Please ensure it is UTF-8 encoded.")
+                logger.error("UnicodeDecodeError reading CSV")
+            except csv.Error as csv_err:
+                processing_results["warnings"].append(f"Could not parse CSV file: {csv_err}")
+                logger.error(f"CSV Error: {csv_err}")
+            except Exception as read_err:
+                processing_results["warnings"].append(f"Could not process CSV file: {read_err}")
+                logger.error(f"Error reading CSV file: {read_err}", exc_info=True)
+            finally:
+                csv_text.detach()
+
+        lcsc_id_input = ""
+        csv_filename = None
+        if request.mimetype == 'multipart/form-data':
+            form = MultipartReader(request.stream, request.mimetype_params.get('boundary', '').encode())
+            try:
+                for name, filename in form.parts():
+                    if name == 'lcsc_id':
+                        lcsc_id_input = b"".join(form.data()).decode('utf-8', 'replace').strip()
+                        if lcsc_id_input:
+                            add_input_id(lcsc_id_input)
+                    elif name == 'csv_file':
+                        csv_filename = filename
+                        if filename:
+                            add_csv_ids(form.data())
+            except ValueError as form_err:
+                processing_results["warnings"].append(f"Could not read the upload: {form_err}")
+                logger.error(f"Malformed multipart upload: {form_err}")
+        else:
+            lcsc_id_input = request.form.get('lcsc_id', '').strip()
+            if lcsc_id_input:
+                add_input_id(lcsc_id_input)
+
+        if job:
+            close_job_input(job, skipped_ids, processing_results["warnings"])
+            job_tracer.record("read_input", input_started, time.time() - input_started, job_id=job["id"])
+            job_id = job["id"]
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify(job_summary(job)), 202
+        elif output:
+            processing_results["warnings"].append(output)
+        elif skipped_ids:
+            processing_results["skipped"].extend(skipped_ids)
+        elif csv_filename == "" and not lcsc_id_input:
+            output = "Please enter an LCSC ID or upload a CSV file."
+            processing_results["warnings"].append(output)
+        elif not input_count and request.method == "POST":
+            output = "No LCSC IDs provided."
+            processing_results["warnings"].append(output)
+
+    # Determine the directory to display
+    display_path_rel = request.args.get('path', '.')
+    display_path_abs = os.path.abspath(os.path.join(library_base_dir, display_path_rel))
+
+    # Security check to prevent Browse outside the library root
+    if not display_path_abs.startswith(os.path.abspath(library_base_dir)):
+        logger.warning(f"Attempted to access path outside library root: {display_path_abs}")
+        abort(403)
+
+    directory_listing_html = render_directory_listing(display_path_abs, library_base_dir,
+                                                      page=request.args.get('page', 1, type=int),
+                                                      sort=request.args.get('sort', 'name'))
+
+    job = get_job(job_id) if job_id else None
+    if job:
+        processing_results = job["results"]
+
+    return render_template_string(HTML,
+                                   current_library=current_library,
+                                   directory_listing_html=directory_listing_html,
+                                   current_display_path=os.path.relpath(display_path_abs, library_base_dir) if display_path_abs != library_base_dir else ".",
+                                   output=output,
+                                   job=job,
+                                   job_progress=job_progress(job) if job else None,
+                                   processing_results=processing_results if request.method == "POST" or job else None)
+
+
+@app.route('/download/<path:filename>')
+def download_file(filename):
+    full_path = os.path.join(OUTPUT_BASE, filename)
+    if not os.path.isfile(full_path):
+        abort(404)
+    # Security check: Ensure the requested file is within the OUTPUT_BASE
+    if not os.path.abspath(full_path).startswith(os.path.abspath(OUTPUT_BASE)):
+        logger.warning(f"Attempted to download file outside OUTPUT_BASE: {full_path}")
+        abort(403)
+    parts = os.path.normpath(filename).split(os.sep)
+    if len(parts) > 2 and parts[0] == LIBRARY_ROOT_NAME and parts[1].startswith(LIB_PREFIX):
+        try:
+            get_catalog(os.path.abspath(os.path.join(OUTPUT_BASE, LIBRARY_ROOT_NAME, parts[1]))).touch_path(os.path.join(*parts[2:]))
+        except Exception as e:
+            logger.warning(f"Could not record download of {filename}: {e}")
+    return send_from_directory(OUTPUT_BASE, filename, as_attachment=True)
+
+
+# Bulk API: POST /api/v1/convert takes a JSON list of LCSC IDs or NDJSON with one ID (or
+# {"lcsc_id": ...}) per line, for the library given by ?library= (default: the current one).
+# Both are decoded entry by entry, and the IDs are queued as one job while the body is read;
+# then one NDJSON line per part is streamed back as soon as that part is finished. Lines are
+# written as they come instead of being collected; blank lines are keep-alives sent while no
+# part finishes. The stream ends early if the job stops before every part reported.
+API_KEEPALIVE_SECONDS = 15
+API_READ_SIZE = 8 * 1024  # A read blocks until this much has arrived, like MULTIPART_CHUNK_SIZE
+JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def json_array_entries(stream):
+    """Values of a JSON list, decoded one by one while it is read from stream. Raises ValueError
+    when the body is not a JSON list."""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer, pos, eof = "", 0, False
+
+    def read_more():
+        nonlocal buffer, pos, eof
+        chunk = stream.read(API_READ_SIZE)
+        eof = not chunk
+        buffer = buffer[pos:] + utf8.decode(chunk, final=eof)
+        pos = 0
+
+    def next_char():
+        """The next character after whitespace, '' at the end of the body."""
+        nonlocal pos
+        while True:
+            pos = JSON_WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer) or eof:
+                return buffer[pos:pos + 1]
+            read_more()
+
+    if next_char() != "[":
+        raise ValueError("expected a JSON list of LCSC IDs")
+    pos += 1
+    if next_char() == "]":
+        return
+    while True:
+        next_char()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                # A value is complete once its separator has been read: "1." or "tr" at the end of a
+                # chunk would otherwise decode as 1 or fail, although the next chunk continues them.
+                following = JSON_WHITESPACE.match(buffer, end).end()
+                if eof or (following < len(buffer) and buffer[following] in ",]"):
+                    break
+            except ValueError:
+                if eof:
+                    raise
+            read_more()
+        pos = end
+        yield value
+        separator = next_char()
+        pos += 1
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError(f"expected ',' or ']' after list entry, got {separator or 'end of body'!r}")
+
+
+def ndjson_entries(stream):
+    """Values of the non-empty lines of an NDJSON stream; a line that is not JSON is yielded as text."""
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield line.decode('utf-8', 'replace')
+
+
+def api_part_result(catalog, library, event):
+    """The NDJSON result line of one part: status, artifacts (with download URLs), duration and errors."""
+    result = {"lcsc_id": event["lcsc_id"], "status": event["status"], "library": library,
+              "duration": event.get("duration"), "artifacts": [], "errors": event.get("errors", [])}
+    if event["status"] in ("processed", "skipped"):
+        part = catalog.get_part(event["lcsc_id"])
+        result["models_pending"] = bool(part and part["models_pending"])
+        for artifact in part["artifacts"] if part else []:
+            result["artifacts"].append({"kind": artifact["kind"], "name": artifact["name"], "size": artifact["size"],
+                                        "url": f"/download/{LIBRARY_ROOT_NAME}/{library}/{artifact['path']}"})
+    return json.dumps(result) + "\n"
+
+
+@app.route('/api/v1/convert', methods=['POST'])
+def api_convert():
+    state = library_state.snapshot()
+    if request.mimetype == 'application/json':
+        entries = json_array_entries(request.stream)
+    else:
+        entries = ndjson_entries(request.stream)
+    library = request.args.get('library') or state["current_library"]
+    if library not in (entry["name"] for entry in state["libraries"]):
+        return jsonify({"error": f"Unknown library '{library}'."}), 404
+    library_dir = os.path.join(state["library_root"], library)
+    catalog = get_catalog(library_dir)
+    try:
+        first_entry = next(entries, None)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid JSON body: {e}"}), 400
+    if first_entry is None:
+        logger.info(f"API: no LCSC IDs received for library '{library}'")
+        return Response("", mimetype='application/x-ndjson')
+
+    job = create_job(library, library_dir)
+    listener = Queue()
+    with jobs_lock:
+        job_listeners[job["id"]] = listener
+
+    def read_input():
+        """Add the IDs of the body to the job while it is decoded, and report the ones not converted.
+        Ends by putting the number of result lines to expect into listener."""
+        log_context.job_id = job["id"]
+        input_started = time.time()
+        received = 0
+        skipped_ids = {}  # Insertion-ordered; IDs to convert are deduplicated by job["items"]
+        entry = first_entry
+        try:
+            while entry is not None:
+                received += 1
+                raw_id = entry.get("lcsc_id") if isinstance(entry, dict) else entry
+                lcsc_id = normalize_lcsc_id(raw_id) if isinstance(raw_id, str) else None
+                if not lcsc_id:
+                    listener.put({"lcsc_id": raw_id, "status": "invalid",
+                                  "errors": [f"Invalid LCSC ID {raw_id!r}. Must be like C123456."]})
+                elif lcsc_id in job["items"] or lcsc_id in skipped_ids:
+                    listener.put({"lcsc_id": lcsc_id, "status": "duplicate", "errors": ["Listed more than once."]})
+                elif lcsc_id in catalog:
+                    skipped_ids[lcsc_id] = None
+                    catalog.touch(lcsc_id)
+                    PARTS_TOTAL.inc(result="skipped")
+                    listener.put({"lcsc_id": lcsc_id, "status": "skipped", "duration": 0})
+                else:
+                    add_job_items(job, [lcsc_id])
+                entry = next(entries, None)
+        except ValueError as e:
+            # IDs already read are converted, the rest of the body is reported as one error
+            received += 1
+            listener.put({"lcsc_id": None, "status": "invalid", "errors": [f"Invalid JSON body: {e}"]})
+        except Exception as e:
+            logger.error(f"API: reading the body of job {job['id']} failed: {e}")
+        finally:
+            close_job_input(job, list(skipped_ids))
+            job_tracer.record("read_input", input_started, time.time() - input_started, job_id=job["id"])
+            logger.info(f"API: {received} LCSC IDs received for library '{library}' in job {job['id']}")
+            listener.put(received)
+            log_context.job_id = None
+
+    threading.Thread(target=read_input, name=f"api_input_{job['id']}", daemon=True).start()
+
+    def unreported_results():
+        """Result lines of the parts a stopped job never finished."""
+        stopped = get_job(job["id"])
+        for item_id, item_state in stopped["items"].items():
+            if item_state not in JOB_FINAL_ITEM_STATES:
+                yield api_part_result(catalog, library, {"lcsc_id": item_id, "status": item_state,
+                                                         "errors": [f"Job {stopped['status']}."]})
+
+    def generate():
+        reported, expected = 0, None
+        try:
+            while expected is None or reported < expected:
+                try:
+                    event = listener.get(timeout=API_KEEPALIVE_SECONDS)
+                except Empty:
+                    if (expected is not None and get_job_status(job["id"]) not in JOB_ACTIVE_STATES
+                            and listener.empty()):
+                        yield from unreported_results()
+                        return
+                    yield "\n"
+                    continue
+                if isinstance(event, int):  # End of the input
+                    expected = event
+                    continue
+                reported += 1
+                yield api_part_result(catalog, library, event)
+        finally:
+            with jobs_lock:
+                job_listeners.pop(job["id"], None)
+
+    return Response(generate(), mimetype='application/x-ndjson',
+                    headers={"X-Job-Id": job["id"], "Location": f"/jobs/{job['id']}"})
+
+
+# Library exports: /export/<library> streams a ZIP or tar.gz of the library while it is built and
+# tees it into EXPORTS_DIR. The finished archive is keyed by the library's content version, so
+# repeated and resumed (Range) downloads are served from that file until the library changes.
+EXPORTS_DIR = os.path.join(OUTPUT_BASE, "exports")
+EXPORT_FOLDERS = ("symbols", "footprints", "3dshapes")
+EXPORT_FORMATS = {"zip": "application/zip", "tar.gz": "application/gzip"}
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+def library_export_files(library_dir):
+    """(archive name, path, size, mtime_ns) of every file to export, sorted by archive name."""
+    files = []
+    for folder in EXPORT_FOLDERS:
+        folder_path = os.path.join(library_dir, folder)
+        if not os.path.isdir(folder_path):
+            continue
+        for entry in os.scandir(folder_path):
+            if entry.name.startswith(".") or not entry.is_file():
+                continue  # Library metadata (symbol index) stays out of the archive
+            stats = entry.stat()
+            files.append((f"{folder}/{entry.name}", entry.path, stats.st_size, stats.st_mtime_ns))
+    files.sort()
+    return files
+
+
+def library_content_version(files):
+    sha = hashlib.sha256()
+    for name, path, size, mtime_ns in files:
+        sha.update(f"{name}\0{size}\0{mtime_ns}\n".encode())
+    return sha.hexdigest()[:16]
+
+
+class ChunkBuffer:
+    """Unseekable file object collecting what an archive writer produces until it is drained."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def generate_archive(library_name, files, archive_format):
+    """Yield the archive in chunks as it is written; nothing but the current chunk is held."""
+    buffer = ChunkBuffer()
+    if archive_format == "zip":
+        # ZipFile writes data descriptors when the target cannot seek, so entries can be streamed
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, path, size, mtime_ns in files:
+                try:
+                    source = open(path, 'rb')
+                except FileNotFoundError:
+                    continue  # Removed by cleanup meanwhile; the version check discards this archive
+                with source:
+                    info = zipfile.ZipInfo.from_file(path, f"{library_name}/{name}")
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    with archive.open(info, 'w') as entry:
+                        for chunk in iter(lambda: source.read(EXPORT_CHUNK_SIZE), b""):
+                            entry.write(chunk)
+                            data = buffer.drain()
+                            if data:
+                                yield data
+                data = buffer.drain()
+                if data:
+                    yield data
+    else:
+        with tarfile.open(fileobj=buffer, mode='w|gz') as archive:
+            for name, path, size, mtime_ns in files:
+                try:
+                    source = open(path, 'rb')
+                except FileNotFoundError:
+                    continue
+                with source:
+                    archive.addfile(archive.gettarinfo(arcname=f"{library_name}/{name}", fileobj=source), source)
+                data = buffer.drain()
+                if data:
+                    yield data
+    data = buffer.drain()
+    if data:
+        yield data
+
+
+def cache_export(library_name, library_dir, files, version, archive_format, cache_path):
+    """Stream an archive while writing it to cache_path.
+
+    The copy is kept only when the whole archive was produced and the library did not change
+    meanwhile; older cached versions of the same export are removed then.
+    """
+    os.makedirs(EXPORTS_DIR, exist_ok=True)
+    tmp_path = f"{cache_path}.{uuid.uuid4().hex[:8]}.tmp"
+    completed = False
+    try:
+        with open(tmp_path, 'wb') as cache_file:
+            for chunk in generate_archive(library_name, files, archive_format):
+                cache_file.write(chunk)
+                yield chunk
+        completed = True
+    finally:
+        if completed and library_content_version(library_export_files(library_dir)) == version:
+            os.replace(tmp_path, cache_path)
+            logger.info(f"Cached export {os.path.relpath(cache_path, OUTPUT_BASE)}")
+            stale = re.compile(rf"^{re.escape(library_name)}-[0-9a-f]{{16}}\.{re.escape(archive_format)}$")
+            for name in os.listdir(EXPORTS_DIR):
+                if stale.match(name) and name != os.path.basename(cache_path):
+                    try:
+                        os.remove(os.path.join(EXPORTS_DIR, name))
+                    except FileNotFoundError:
+                        pass
+        else:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+
+
+@app.route('/export/<library_name>')
+def export_library(library_name):
+    archive_format = request.args.get('format', 'zip')
+    if archive_format not in EXPORT_FORMATS:
+        abort(400, description=f"Unsupported export format '{archive_format}', use one of: {', '.join(EXPORT_FORMATS)}")
+    libraries = {folder['name']: folder['path'] for folder in library_state.snapshot()["libraries"]}
+    if library_name not in libraries:
+        abort(404)
+    library_dir = libraries[library_name]
+    files = library_export_files(library_dir)
+    version = library_content_version(files)
+    download_name = f"{library_name}.{archive_format}"
+    cache_path = os.path.join(EXPORTS_DIR, f"{library_name}-{version}.{archive_format}")
+    if not os.path.isfile(cache_path) and request.range:
+        # A resumed download needs a complete file to seek in, so build the cached archive first
+        logger.info(f"Building export {download_name} for a range request")
+        for _ in cache_export(library_name, library_dir, files, version, archive_format, cache_path):
+            pass
+    if os.path.isfile(cache_path):
+        return send_file(cache_path, mimetype=EXPORT_FORMATS[archive_format], as_attachment=True,
+                         download_name=download_name, conditional=True, etag=version)
+    logger.info(f"Streaming export {download_name} of {len(files)} files")
+    return Response(cache_export(library_name, library_dir, files, version, archive_format, cache_path),
+                    mimetype=EXPORT_FORMATS[archive_format],
+                    headers={"Content-Disposition": f'attachment; filename="{download_name}"',
+                             "ETag": f'"{version}"'})
+
+
+SERVER_THREADS = 32  # Requests served at once by the threaded server; each open log stream holds one
+
+
+def serve_threaded():
+    """Serve with cheroot's thread pool, or the Werkzeug development server if cheroot is missing."""
+    try:
+        from cheroot.wsgi import Server
+    except ImportError as e:
+        logger.warning(f"cheroot is not available ({e}), using the development server.")
+        app.run(debug=False, host='0.0.0.0', port=7860, threaded=True)
+        return
+    server = Server(('0.0.0.0', 7860), app, numthreads=SERVER_THREADS, server_name="easyeda-to-kicad")
+    logger.info(f"Serving with cheroot ({SERVER_THREADS} threads) on port 7860")
+    try:
+        server.start()
+    except KeyboardInterrupt:
+        server.stop()
 
 
 if __name__ == '__main__':
-    app.run(debug=False, host='0.0.0.0', port=7860)
\ No newline at end of file
+    if SERVER_MODE_ERROR:
+        logger.warning(f"gevent is not available ({SERVER_MODE_ERROR}), using the threaded server.")
+    if SERVER_MODE == "gevent":
+        from gevent.pywsgi import WSGIServer
+        logger.info("Serving with gevent on port 7860")
+        WSGIServer(('0.0.0.0', 7860), app).serve_forever()
+    elif SERVER_MODE == "threaded":
+        serve_threaded()
+    else:
+        app.run(debug=False, host='0.0.0.0', port=7860, threaded=True)
\ No newline at end of file
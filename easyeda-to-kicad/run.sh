@@ -1,3 +1,6 @@
 #!/usr/bin/with-contenv bashio
 echo "Starting EasyEDA to KiCad Web Converter..."
+if bashio::config.has_value 'server_mode'; then
+    export SERVER_MODE="$(bashio::config 'server_mode')"
+fi
 python3 /app/easyeda_to_kicad.py